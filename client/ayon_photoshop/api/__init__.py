@@ -4,7 +4,7 @@ Anything that isn't defined here is INTERNAL and unreliable for external use.
 
 """
 
-from .launch_logic import stub
+from .launch_logic import stub, async_stub
 
 from .pipeline import (
     PhotoshopHost,
@@ -20,11 +20,19 @@ from .plugin import (
 from .lib import (
     maintained_selection,
     isolated_layers_visibility,
+    get_isolated_visibility,
+)
+from .layer_tree import LayerTree
+from .document_snapshot import (
+    DocumentSnapshot,
+    get_document_snapshot,
+    refresh_document_snapshot,
 )
 
 __all__ = [
     # launch_logic
     "stub",
+    "async_stub",
 
     # pipeline
     "PhotoshopHost",
@@ -38,4 +46,13 @@ __all__ = [
     # lib
     "maintained_selection",
     "isolated_layers_visibility",
+    "get_isolated_visibility",
+
+    # layer_tree
+    "LayerTree",
+
+    # document_snapshot
+    "DocumentSnapshot",
+    "get_document_snapshot",
+    "refresh_document_snapshot",
 ]
@@ -0,0 +1,287 @@
+"""Compositing of extracted images with Photoshop blend modes.
+
+Images extracted per instance are composited in stack order outside of
+Photoshop, so flattened review doesn't need another Photoshop export.
+
+Sources are decoded by 'oiiotool' to uncompressed 8 bit TGA placed in full
+canvas, pixel data are mapped by NumPy and composited in bands of rows in
+parallel threads (NumPy releases GIL in array operations). Memory is
+bounded by size of band, not canvas.
+
+NumPy is optional, 'is_available' returns False when it is missing.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from ayon_core.lib import get_oiio_tool_args, run_subprocess
+
+from . import tiled_export, transcoding
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# approximate memory of one composited band
+_BAND_SIZE = 16 * 1024 * 1024
+
+
+def _blend_normal(backdrop, source):
+    return source
+
+
+def _blend_multiply(backdrop, source):
+    return backdrop * source
+
+
+def _blend_screen(backdrop, source):
+    return backdrop + source - backdrop * source
+
+
+def _blend_hard_light(backdrop, source):
+    return np.where(
+        source <= 0.5,
+        2.0 * backdrop * source,
+        _blend_screen(backdrop, 2.0 * source - 1.0)
+    )
+
+
+def _blend_overlay(backdrop, source):
+    return _blend_hard_light(source, backdrop)
+
+
+def _blend_darken(backdrop, source):
+    return np.minimum(backdrop, source)
+
+
+def _blend_lighten(backdrop, source):
+    return np.maximum(backdrop, source)
+
+
+def _blend_difference(backdrop, source):
+    return np.abs(backdrop - source)
+
+
+def _blend_linear_dodge(backdrop, source):
+    return np.minimum(backdrop + source, 1.0)
+
+
+# separable blend modes by Photoshop 'stringID' ('PSItem.blend_mode'),
+#   functions work with non premultiplied colors
+BLEND_MODES = {
+    "normal": _blend_normal,
+    "passThrough": _blend_normal,
+    "multiply": _blend_multiply,
+    "screen": _blend_screen,
+    "overlay": _blend_overlay,
+    "hardLight": _blend_hard_light,
+    "darken": _blend_darken,
+    "lighten": _blend_lighten,
+    "difference": _blend_difference,
+    "linearDodge": _blend_linear_dodge,
+}
+
+
+def is_available():
+    """Returns True if NumPy is available."""
+    return np is not None
+
+
+def is_supported(blend_mode):
+    """Returns True if 'blend_mode' could be composited."""
+    return blend_mode in BLEND_MODES
+
+
+class _MappedImage:
+    """Pixel data of uncompressed TGA mapped to memory."""
+
+    def __init__(self, path, blend_mode):
+        tile = tiled_export.TGATile(path)
+        tile.close()
+        self.width = tile.width
+        self.height = tile.height
+        self.blend_mode = blend_mode
+        self._top_origin = tile.top_origin
+        self._pixels = np.memmap(
+            path,
+            dtype=np.uint8,
+            mode="r",
+            offset=tile.data_offset,
+            shape=(tile.height, tile.width, tile.pixel_size)
+        )
+
+    def read_band(self, start, stop):
+        """Returns rows 'start' to 'stop' (from top) as colors and alpha.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: RGB and alpha in 0-1 range
+        """
+        if self._top_origin:
+            band = self._pixels[start:stop]
+        else:
+            band = self._pixels[
+                self.height - stop:self.height - start][::-1]
+        band = band.astype(np.float32) / 255.0
+        color = band[..., 2::-1]
+        if band.shape[2] == 4:
+            alpha = band[..., 3:4]
+        else:
+            alpha = np.ones(band.shape[:2] + (1, ), dtype=np.float32)
+        return color, alpha
+
+    def close(self):
+        """Releases mapped file, so it could be removed."""
+        pixels = self._pixels
+        self._pixels = None
+        if pixels is not None and pixels._mmap is not None:
+            pixels._mmap.close()
+
+
+def _composite_band(images, start, stop):
+    """Composites rows of 'images' (from bottom to top).
+
+    Returns:
+        bytes: BGRA rows
+    """
+    out_color = None
+    out_alpha = None
+    for image in images:
+        color, alpha = image.read_band(start, stop)
+        if out_color is None:
+            out_color = color * alpha
+            out_alpha = alpha
+            continue
+        if image.blend_mode in ("normal", "passThrough"):
+            out_color = color * alpha + out_color * (1.0 - alpha)
+        else:
+            backdrop = np.divide(
+                out_color, out_alpha,
+                out=np.zeros_like(out_color),
+                where=out_alpha > 0
+            )
+            blended = BLEND_MODES[image.blend_mode](backdrop, color)
+            out_color = (
+                color * alpha * (1.0 - out_alpha)
+                + out_color * (1.0 - alpha)
+                + alpha * out_alpha * blended
+            )
+        out_alpha = alpha + out_alpha * (1.0 - alpha)
+
+    color = np.divide(
+        out_color, out_alpha,
+        out=np.zeros_like(out_color),
+        where=out_alpha > 0
+    )
+    result = np.empty(out_color.shape[:2] + (4, ), dtype=np.uint8)
+    result[..., 2::-1] = np.rint(np.clip(color, 0.0, 1.0) * 255.0)
+    result[..., 3] = np.rint(out_alpha[..., 0] * 255.0)
+    return result.tobytes()
+
+
+def _composite_to_tga(images, dst_path, max_workers):
+    """Composites mapped 'images' (from bottom to top) to TGA."""
+    width = images[0].width
+    height = images[0].height
+    if any((img.width, img.height) != (width, height) for img in images):
+        raise ValueError("Composited images differ in size")
+
+    band_rows = max(1, _BAND_SIZE // (width * 4 * 4 * len(images)))
+    bands = [
+        (start, min(start + band_rows, height))
+        for start in range(0, height, band_rows)
+    ]
+    with open(dst_path, "wb") as stream, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = tiled_export.TGAWriter(stream, width, height)
+        # bands are submitted in chunks to keep memory bounded
+        for chunk_start in range(0, len(bands), max_workers):
+            futures = [
+                executor.submit(_composite_band, images, start, stop)
+                for start, stop in bands[
+                    chunk_start:chunk_start + max_workers]
+            ]
+            for future in futures:
+                writer.write_row(future.result())
+        writer.close()
+
+
+def _decode_source(src_path, trim, dst_path, logger):
+    args = get_oiio_tool_args(
+        "oiiotool",
+        src_path,
+        *transcoding.get_placement_args(trim),
+        "-d", "uint8",
+        "--compression", "none",
+        "-o", dst_path
+    )
+    run_subprocess(args, logger=logger)
+
+
+def composite_images(
+    sources, dst_path, extension, logger=None, max_workers=None, resize=None
+):
+    """Composites images with their blend modes to 'extension' format.
+
+    Args:
+        sources (list[tuple[str, dict, str]]): (path, trim, blend mode) of
+            images, from top to bottom, see 'is_supported'
+        dst_path (str): output path
+        extension (str): output format, 'tga' or format which could be
+            converted (see 'transcoding.can_convert')
+        logger (logging.Logger): logger for subprocess output
+        max_workers (int): parallel threads, count of CPU cores if not set
+        resize (tuple[int, int]): output resolution, not used for 'tga'
+    """
+    if np is None:
+        raise RuntimeError("NumPy is not available")
+    for _, _, blend_mode in sources:
+        if not is_supported(blend_mode):
+            raise ValueError(f"Blend mode '{blend_mode}' is not supported")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    tmp_dir = tempfile.mkdtemp(prefix="ayon_composite_")
+    try:
+        # bottom layer first
+        decoded = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for idx, (src_path, trim, blend_mode) in enumerate(
+                reversed(sources)
+            ):
+                path = os.path.join(tmp_dir, f"source_{idx}.tga")
+                decoded.append((path, blend_mode))
+                futures.append(executor.submit(
+                    _decode_source, src_path, trim, path, logger
+                ))
+            for future in futures:
+                future.result()
+
+        composite_path = dst_path
+        if extension != "tga":
+            composite_path = os.path.join(tmp_dir, "composite.tga")
+
+        images = []
+        try:
+            for path, blend_mode in decoded:
+                images.append(_MappedImage(path, blend_mode))
+            _composite_to_tga(images, composite_path, max_workers)
+        finally:
+            # mapped files must be released before they are removed
+            for image in images:
+                image.close()
+
+        if extension != "tga":
+            transcoding.convert_image(
+                composite_path, dst_path, extension, logger=logger,
+                resize=resize
+            )
+    finally:
+        try:
+            shutil.rmtree(tmp_dir)
+        except OSError as exc:
+            if logger is not None:
+                logger.warning(
+                    f"Failed to remove temporary files {tmp_dir}: {exc}"
+                )
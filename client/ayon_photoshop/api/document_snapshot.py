@@ -0,0 +1,106 @@
+"""State of active document shared by publish plugins.
+
+Collectors and extractors need same data (layers, metadata, color profile,
+...) of document. 'DocumentSnapshot' is captured once, with all reads
+awaited together, and stored in publish context. Plugins which change
+layers or metadata must call 'refresh_document_snapshot' afterwards.
+
+Artist might change document between collection and extraction (eg. fix
+validation issues in Photoshop and continue publishing). Plugins which
+change document based on snapshot (eg. isolate and restore visibility)
+must use 'get_document_snapshot' with 'check_changes', snapshot is
+captured again if change token of document differs.
+"""
+import attr
+
+from .launch_logic import stub, async_stub
+from .layer_tree import LayerTree
+
+CONTEXT_KEY = "documentSnapshot"
+
+
+@attr.s(frozen=True)
+class DocumentSnapshot(object):
+    """Immutable state of active document.
+
+    Items of 'layers_meta' are copies, changing them doesn't change
+    document (use 'stub.imprint').
+    """
+    layer_tree = attr.ib()  # LayerTree indexed with 'layers_meta'
+    layers_meta = attr.ib(converter=tuple)  # metadata items from document
+    color_profile = attr.ib()  # name of color profile of document
+    document_settings = attr.ib()  # see 'stub.get_document_settings'
+    document_name = attr.ib()  # name of document file
+    change_token = attr.ib(default=None)  # see 'stub.get_change_token'
+
+    @property
+    def layers(self):
+        """All layers in document order."""
+        return self.layer_tree.layers
+
+    def get_layer(self, layer_id):
+        """Returns PSItem with 'layer_id' or None."""
+        return self.layer_tree.get(layer_id)
+
+
+def capture_document_snapshot():
+    """Reads state of active document in single round trip.
+
+    Returns:
+        DocumentSnapshot
+    """
+    ps_stub = async_stub()
+    # token is read first, change during reading leads to another capture
+    _, change_token = ps_stub.run(ps_stub.get_change_token())
+    (
+        layers, layers_meta, color_profile, document_settings, document_name
+    ) = ps_stub.run(ps_stub.gather(
+        ps_stub.get_layers(),
+        ps_stub.get_layers_metadata(),
+        ps_stub.get_color_profile_name(),
+        ps_stub.get_document_settings(),
+        ps_stub.get_active_document_name(),
+    ))
+    return DocumentSnapshot(
+        layer_tree=LayerTree(layers, layers_meta),
+        layers_meta=layers_meta,
+        color_profile=color_profile,
+        document_settings=document_settings,
+        document_name=document_name,
+        change_token=change_token,
+    )
+
+
+def get_document_snapshot(context, check_changes=False):
+    """Returns snapshot stored in publish 'context', captures it if missing.
+
+    Args:
+        context (pyblish.api.Context)
+        check_changes (bool): capture snapshot again if document changed
+            since it was captured, costs one call to Photoshop
+
+    Returns:
+        DocumentSnapshot
+    """
+    snapshot = context.data.get(CONTEXT_KEY)
+    if snapshot is None:
+        return refresh_document_snapshot(context)
+    if check_changes:
+        _, change_token = stub().get_change_token()
+        if change_token is None or change_token != snapshot.change_token:
+            snapshot = refresh_document_snapshot(context)
+    return snapshot
+
+
+def refresh_document_snapshot(context):
+    """Captures new snapshot into publish 'context' after document changed.
+
+    Args:
+        context (pyblish.api.Context)
+
+    Returns:
+        DocumentSnapshot
+    """
+    snapshot = capture_document_snapshot()
+    context.data[CONTEXT_KEY] = snapshot
+    return snapshot
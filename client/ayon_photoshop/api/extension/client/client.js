@@ -107,14 +107,52 @@
                   });
       });
 
+      RPC.addRoute('Photoshop.read_metadata', function (data) {
+              log.warn('Server called client route "read_metadata":', data);
+              var keys = data.keys !== undefined ? data.keys : "null";
+              return runEvalScript("readMetadata(" + keys + ")")
+                  .then(function(result){
+                      log.warn("readMetadata: " + result);
+                      return result;
+                  });
+      });
+
+      RPC.addRoute('Photoshop.write_metadata', function (data) {
+              log.warn('Server called client route "write_metadata":', data);
+              var escaped = EscapeStringForJSX(data.payload);
+              return runEvalScript("writeMetadata('" + escaped + "')")
+                  .then(function(result){
+                      log.warn("writeMetadata: " + result);
+                      return result;
+                  });
+      });
+
       RPC.addRoute('Photoshop.get_layers', function (data) {
               log.warn('Server called client route "get_layers":', data);
-              return runEvalScript("getLayers()")
+              var fields = data.fields !== undefined ? data.fields : "null";
+              return runEvalScript("getLayers(" + fields + ")")
                   .then(function(result){
                       log.warn("getLayers: " + result);
                       return result;
                   });
       });
+      RPC.addRoute('Photoshop.get_layers_delta', function (data) {
+              log.warn('Server called client route "get_layers_delta":', data);
+              return runEvalScript("getLayersDelta(" + data.since_token + ", " +
+                                   data.force + ")")
+                  .then(function(result){
+                      log.warn("getLayersDelta: " + result);
+                      return result;
+                  });
+      });
+      RPC.addRoute('Photoshop.get_change_token', function (data) {
+              log.warn('Server called client route "get_change_token":', data);
+              return runEvalScript("getChangeToken()")
+                  .then(function(result){
+                      log.warn("getChangeToken: " + result);
+                      return result;
+                  });
+      });
       RPC.addRoute('Photoshop.get_color_profile_name', function (data) {
               log.warn('Server called client route "get_color_profile_name":', data);
               return runEvalScript("getColorProfileName()")
@@ -290,6 +328,16 @@
                   });
       });
 
+      RPC.addRoute('Photoshop.delete_layers', function (data) {
+              log.warn('Server called route "delete_layers":', data);
+              return runEvalScript("deleteLayers('" +
+                                   data.layer_ids + "')")
+                  .then(function(result){
+                      log.warn("delete_layers: " + result);
+                      return result;
+                  });
+      });
+
       RPC.addRoute('Photoshop.rename_layer', function (data) {
         log.warn('Server called route "rename_layer":', data);
         return runEvalScript("renameLayer("+data.layer_id+", " +
@@ -341,6 +389,18 @@
                   });
       });
 
+      RPC.addRoute('Photoshop.export_layerset', function (data) {
+              log.warn('Server called client route "export_layerset":', data);
+              var escapedPath = EscapeStringForJSX(data.path);
+              return runEvalScript("exportLayerSet(" + data.layerset_id + ", '" +
+                                   escapedPath + "', " +
+                                   data.merge_layersets + ")")
+                  .then(function(result){
+                      log.warn("export_layerset: " + result);
+                      return result;
+                  });
+      });
+
       RPC.addRoute('Photoshop.close_document', function (data) {
                 log.warn('Server called client route "close_document":', data);
                 return runEvalScript("closeDocument("+data.id+")")
@@ -369,6 +429,58 @@
                   });
       });
 
+      RPC.addRoute('Photoshop.export_layer_comps', function (data) {
+              log.warn('Server called client route "export_layer_comps":', data);
+              var escaped = EscapeStringForJSX(data.payload);
+              return runEvalScript("exportLayerComps('" + escaped + "')")
+                  .then(function(result){
+                      log.warn("exportLayerComps: " + result);
+                      return result;
+                  });
+      });
+
+      RPC.addRoute('Photoshop.save_trimmed', function (data) {
+              log.warn('Server called client route "save_trimmed":', data);
+              var escaped = EscapeStringForJSX(data.payload);
+              return runEvalScript("saveTrimmed('" + escaped + "')")
+                  .then(function(result){
+                      log.warn("save_trimmed: " + result);
+                      return result;
+                  });
+      });
+
+      RPC.addRoute('Photoshop.export_tiles', function (data) {
+              log.warn('Server called client route "export_tiles":', data);
+              var escaped = EscapeStringForJSX(data.payload);
+              return runEvalScript("exportTiles('" + escaped + "')")
+                  .then(function(result){
+                      log.warn("export_tiles: " + result);
+                      return result;
+                  });
+      });
+
+      RPC.addRoute('Photoshop.get_content_fingerprints', function (data) {
+              log.warn('Server called client route "get_content_fingerprints":', data);
+              var escaped = EscapeStringForJSX(data.payload);
+              return runEvalScript("getContentFingerprints('" + escaped + "')")
+                  .then(function(result){
+                      log.warn("getContentFingerprints: " + result);
+                      return result;
+                  });
+      });
+
+      RPC.addRoute('Photoshop.batch', function (data) {
+              log.warn('Server called client route "batch":', data);
+              var escaped = EscapeStringForJSX(data.payload);
+              var historyName = EscapeStringForJSX(data.history_name || "");
+              return runEvalScript("runBatch('" + escaped + "', '" +
+                                   historyName + "')")
+                  .then(function(result){
+                      log.warn("batch: " + result);
+                      return result;
+                  });
+      });
+
       RPC.addRoute('Photoshop.get_extension_version', function (data) {
         log.warn('Server called client route "get_extension_version":', data);
         return get_extension_version();
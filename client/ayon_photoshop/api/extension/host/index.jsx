@@ -41,7 +41,7 @@ function getLayerTypeWithName(layerName) {
     return type;
 }
 
-function getLayers() {
+function getLayers(fields) {
     /**
      * Get json representation of list of layers. 
      * Much faster this way than in DOM traversal (2s vs 45s on same file)
@@ -50,69 +50,266 @@ function getLayers() {
      *      id :    number
      *      name:   string
      *      group:  boolean - true if layer is a group
-     *      parents:array - list of ids of parent groups, useful for selection 
-     *          all children layers from parent layerSet (eg. group)
+     *      parent: number - id of immediate parent group or null, full
+     *          list of parents is derived from it on server side
      *      type:   string - type of layer guessed from its name
      *      visible:boolean - true if visible
+     *
+     * Args:
+     *      fields (array): optional list of fields to read ('name',
+     *          'color_code', 'type', 'visible', 'blend_mode'), 'id', 'group'
+     *          and 'parent' are always present. All fields if not set.
      **/
     if (documents.length == 0){
         return '[]';
     }
+    var layers = _collectLayers(fields);
+    var layersJson = [];
+    for (var i = 0; i < layers.length; i++) {
+        layersJson.push(JSON.stringify(layers[i]));
+    }
+    return '[' + layersJson + ']';
+}
+
+function _getLayerProperty(index, key) {
+    /**
+     * Returns descriptor of layer at 'index' with only 'key' property,
+     * much cheaper than getting full layer descriptor.
+     **/
+    var ref = new ActionReference();
+    ref.putProperty(charIDToTypeID('Prpr'), key);
+    ref.putIndex(charIDToTypeID('Lyr '), index);
+    return executeActionGet(ref);
+}
+
+function _layerDesc(fullDesc, index, key) {
+    /**
+     * Returns full layer descriptor if available or descriptor with 'key'
+     * property of layer at 'index'.
+     **/
+    return fullDesc || _getLayerProperty(index, key);
+}
+
+function _collectLayers(fields) {
+    /**
+     * Returns list of layer objects of active document, see 'getLayers'.
+     *
+     * If 'fields' are provided, only requested properties are read from
+     * each layer.
+     **/
+    var wanted = null;
+    if (fields) {
+        wanted = {};
+        for (var f = 0; f < fields.length; f++) {
+            wanted[fields[f]] = true;
+        }
+    }
+    function isWanted(field) {
+        return wanted === null || wanted[field] === true;
+    }
+    var readName = isWanted('name') || isWanted('type');
+
     var ref1 = new ActionReference();
     ref1.putEnumerated(charIDToTypeID('Dcmn'), charIDToTypeID('Ordn'), 
                        charIDToTypeID('Trgt'));
     var count = executeActionGet(ref1).getInteger(charIDToTypeID('NmbL'));
 
+    var sectionKey = stringIDToTypeID('layerSection');
+    var idKey = stringIDToTypeID("layerID");
+    var nameKey = stringIDToTypeID("name");
+    var colorKey = stringIDToTypeID('color');
+    var visibleKey = stringIDToTypeID("visible");
+    var modeKey = stringIDToTypeID("mode");
+
     // get all layer names
     var layers = [];
-    var layer = {};
     
     var parents = [];
     for (var i = count; i >= 1; i--) {
       var layer = {};
-      var ref2 = new ActionReference();
-      ref2.putIndex(charIDToTypeID('Lyr '), i);
-
-      var desc = executeActionGet(ref2);  // Access layer index #i
-      var layerSection = typeIDToStringID(desc.getEnumerationValue(
-                                          stringIDToTypeID('layerSection')));
-      
-      layer.id = desc.getInteger(stringIDToTypeID("layerID")); 
-      layer.name = desc.getString(stringIDToTypeID("name"));
-      layer.color_code = typeIDToStringID(desc.getEnumerationValue(stringIDToTypeID('color')));
+      var fullDesc = null;
+      if (wanted === null) {
+          var ref2 = new ActionReference();
+          ref2.putIndex(charIDToTypeID('Lyr '), i);
+          fullDesc = executeActionGet(ref2);  // Access layer index #i
+      }
+      var layerSection = typeIDToStringID(_layerDesc(fullDesc, i, sectionKey)
+                                          .getEnumerationValue(sectionKey));
+      if (layerSection == 'layerSectionEnd') {
+        parents.pop();
+        continue;
+      }
+
+      layer.id = _layerDesc(fullDesc, i, idKey).getInteger(idKey);
+      if (readName) {
+          var name = _layerDesc(fullDesc, i, nameKey).getString(nameKey);
+          if (isWanted('name')) {
+              layer.name = name;
+          }
+      }
+      if (isWanted('color_code')) {
+          layer.color_code = typeIDToStringID(
+              _layerDesc(fullDesc, i, colorKey).getEnumerationValue(colorKey));
+      }
       layer.group = false;
-      layer.parents = parents.slice();
-      layer.type = getLayerTypeWithName(layer.name);
-      layer.visible = desc.getBoolean(stringIDToTypeID("visible"));
-      var blendMode = desc.getEnumerationValue(stringIDToTypeID("mode"));
-      layer.blend_mode = typeIDToStringID(blendMode);
+      layer.parent = parents.length ? parents[parents.length - 1] : null;
+      if (isWanted('type')) {
+          layer.type = getLayerTypeWithName(name);
+      }
+      if (isWanted('visible')) {
+          layer.visible = _layerDesc(fullDesc, i, visibleKey).getBoolean(visibleKey);
+      }
+      if (isWanted('blend_mode')) {
+          layer.blend_mode = typeIDToStringID(
+              _layerDesc(fullDesc, i, modeKey).getEnumerationValue(modeKey));
+      }
       //log(" name: " + layer.name + " groupId " + layer.groupId + 
       //" group " + layer.group);
       if (layerSection == 'layerSectionStart') { // Group start and end
         parents.push(layer.id); 
         layer.group = true;                    
       }
-      if (layerSection == 'layerSectionEnd') {
-        parents.pop();
-        continue;
-      } 
-      layers.push(JSON.stringify(layer));
+      layers.push(layer);
     }
      try{
         var bck = activeDocument.backgroundLayer;
+        var layer = {};
         layer.id = bck.id;
-        layer.name = bck.name;
+        if (isWanted('name')) {
+            layer.name = bck.name;
+        }
         layer.group = false;
-        layer.parents = [];
-        layer.type = 'background';
-        layer.visible = bck.visible;
-        layer.blend_mode = typeIDToStringID(bck.blendMode);
-        layers.push(JSON.stringify(layer));
+        layer.parent = null;
+        if (isWanted('type')) {
+            layer.type = 'background';
+        }
+        if (isWanted('visible')) {
+            layer.visible = bck.visible;
+        }
+        if (isWanted('blend_mode')) {
+            layer.blend_mode = typeIDToStringID(bck.blendMode);
+        }
+        layers.push(layer);
     }catch(e){
         // do nothing, no background layer
     };
     //log("layers " + layers);
-    return '[' + layers + ']';
+    return layers;
+}
+
+// last layers snapshot of each document used by 'getLayersDelta'
+//   {document_id: {token: string, layers: {layer_id: layer json}}}
+var _layersSnapshots = {};
+
+function getLayersDelta(sinceToken, force) {
+    /**
+     * Returns json with changes of layers since snapshot 'sinceToken'.
+     *
+     * Layers are compared with last snapshot of active document, only
+     * added, changed (full layer info) and removed (ids) layers are
+     * returned together with order of all layer ids. If snapshot for
+     * 'sinceToken' is not available, all layers are returned ('full').
+     * Layers are not traversed at all if document didn't change since
+     * 'sinceToken' and 'force' is not set.
+     *
+     * Args:
+     *     sinceToken (str): change token of last snapshot known to caller
+     *     force (bool): traverse layers even if change token is same
+     **/
+    if (documents.length == 0){
+        return '';
+    }
+    var tokenData = JSON.parse(getChangeToken());
+    var token = tokenData.token;
+    var docId = tokenData.document_id;
+    var snapshot = _layersSnapshots[docId];
+    if (!snapshot || snapshot.token !== sinceToken) {
+        snapshot = null;
+    }
+    if (snapshot && !force && token === sinceToken) {
+        return JSON.stringify(
+            {document_id: docId, token: token, unchanged: true});
+    }
+
+    var layers = _collectLayers();
+    var currentLayers = {};
+    var allJson = [];
+    var order = [];
+    var added = [];
+    var changed = [];
+    for (var i = 0; i < layers.length; i++) {
+        var layerJson = JSON.stringify(layers[i]);
+        currentLayers[layers[i].id] = layerJson;
+        allJson.push(layerJson);
+        order.push(layers[i].id);
+        if (!snapshot) {
+            continue;
+        }
+        var previous = snapshot.layers[layers[i].id];
+        if (previous === undefined) {
+            added.push(layerJson);
+        } else if (previous !== layerJson) {
+            changed.push(layerJson);
+        }
+    }
+    _layersSnapshots[docId] = {token: token, layers: currentLayers};
+
+    var header = '{"document_id":' + docId + ',"token":' +
+                 JSON.stringify(token);
+    if (!snapshot) {
+        return header + ',"full":true,"layers":[' + allJson + ']}';
+    }
+    var removed = [];
+    for (var layerId in snapshot.layers) {
+        if (snapshot.layers.hasOwnProperty(layerId) &&
+                currentLayers[layerId] === undefined) {
+            removed.push(parseInt(layerId));
+        }
+    }
+    return header + ',"full":false' +
+           ',"added":[' + added + ']' +
+           ',"changed":[' + changed + ']' +
+           ',"removed":' + JSON.stringify(removed) +
+           ',"order":' + JSON.stringify(order) + '}';
+}
+
+function getChangeToken() {
+    /**
+     * Returns json with id of active document and token which changes with
+     * any change of the document.
+     *
+     * Token is composed from current history state (its unique id where
+     * available, index and name), number of history states and layers, so
+     * it is cheap to get compared to full 'getLayers'.
+     **/
+    if (documents.length == 0){
+        return '';
+    }
+    var doc = app.activeDocument;
+    var docRef = new ActionReference();
+    docRef.putEnumerated(charIDToTypeID('Dcmn'), charIDToTypeID('Ordn'),
+                         charIDToTypeID('Trgt'));
+    var layerCount = executeActionGet(docRef).getInteger(
+        charIDToTypeID('NmbL'));
+
+    var parts = [doc.id, layerCount];
+    try {
+        var ref = new ActionReference();
+        ref.putEnumerated(charIDToTypeID('HstS'), charIDToTypeID('Ordn'),
+                          charIDToTypeID('CrnH'));
+        var desc = executeActionGet(ref);
+        var idKey = stringIDToTypeID('ID');
+        if (desc.hasKey(idKey)) {
+            parts.push(desc.getInteger(idKey));
+        }
+        parts.push(desc.getInteger(charIDToTypeID('Cnt ')));
+        parts.push(desc.getInteger(charIDToTypeID('ItmI')));
+        parts.push(desc.getString(charIDToTypeID('Nm  ')));
+    } catch (e) {
+        parts.push(doc.historyStates.length);
+        parts.push(doc.activeHistoryState.name);
+    }
+    return JSON.stringify({document_id: doc.id, token: parts.join(':')});
 }
 
 function setVisible(layer_id, visibility){
@@ -142,6 +339,299 @@ function setLayersVisibility(visibilityMap) {
     }
 }
 
+function exportLayerComps(payload){
+    /**
+     * Exports multiple visibility states of active document in one call.
+     *
+     * Visibility of each export is captured to temporary layer comp, comps
+     * are then applied and saved one by one. Original state is restored
+     * and temporary comps removed at the end.
+     *
+     * Args:
+     *      payload (string): json list of {"name": str,
+     *          "visibility": {layer_id: bool},
+     *          "outputs": [{"path": str, "ext": str}],
+     *          "trim": bool - crop outputs to content (see 'saveTrimmed')}
+     * Returns:
+     *      (string) json {name: {"files": [paths], "error": str|null,
+     *          "trim": bounds of trimmed outputs}}
+     **/
+    var exports = JSON.parse(payload);
+    var doc = app.activeDocument;
+    var result = {};
+    var comps = [];
+    var restore = doc.layerComps.add("ayon_restore", "", false, false, true);
+    try {
+        for (var i = 0; i < exports.length; i++){
+            setLayersVisibility(JSON.stringify(exports[i].visibility));
+            comps.push(doc.layerComps.add(
+                "ayon_export_" + exports[i].name, "", false, false, true
+            ));
+            restore.apply();
+        }
+        for (i = 0; i < exports.length; i++){
+            var item = {"files": [], "error": null};
+            result[exports[i].name] = item;
+            try {
+                comps[i].apply();
+                var outputs = exports[i].outputs;
+                if (exports[i].trim){
+                    item.trim = _saveTrimmed(outputs);
+                    for (var j = 0; j < outputs.length; j++){
+                        item.files.push(outputs[j].path);
+                    }
+                    continue;
+                }
+                for (j = 0; j < outputs.length; j++){
+                    saveAs(outputs[j].path, outputs[j].ext, true);
+                    item.files.push(outputs[j].path);
+                }
+            } catch (e) {
+                item.error = exports[i].name + ": " + e.message;
+            }
+        }
+    } finally {
+        restore.apply();
+        for (i = 0; i < comps.length; i++){
+            comps[i].remove();
+        }
+        restore.remove();
+    }
+    return JSON.stringify(result);
+}
+
+function saveTrimmed(payload){
+    /**
+     * Saves visible content of active document cropped to its bounds.
+     *
+     * Args:
+     *      payload (string): json list of {"path": str, "ext": str}
+     * Returns:
+     *      (string) json {"x": int, "y": int, "width": int, "height": int,
+     *          "canvasWidth": int, "canvasHeight": int}
+     *          offset and size of saved images in original canvas
+     **/
+    return JSON.stringify(_saveTrimmed(JSON.parse(payload)));
+}
+
+function _saveTrimmed(outputs){
+    var doc = app.activeDocument;
+    var rulerUnits = app.preferences.rulerUnits;
+    app.preferences.rulerUnits = Units.PIXELS;
+    var canvasWidth = doc.width.as("px");
+    var canvasHeight = doc.height.as("px");
+    var result = {
+        "x": 0,
+        "y": 0,
+        "width": canvasWidth,
+        "height": canvasHeight,
+        "canvasWidth": canvasWidth,
+        "canvasHeight": canvasHeight
+    };
+    // merged copy has single layer with bounds of all visible content
+    var merged = doc.duplicate("ayon_trim", true);
+    try {
+        var bounds = merged.layers[0].bounds;
+        var left = Math.max(0, bounds[0].as("px"));
+        var top = Math.max(0, bounds[1].as("px"));
+        var right = Math.min(canvasWidth, bounds[2].as("px"));
+        var bottom = Math.min(canvasHeight, bounds[3].as("px"));
+        // empty content keeps whole canvas
+        if (right > left && bottom > top){
+            merged.crop([left, top, right, bottom]);
+            result.x = left;
+            result.y = top;
+            result.width = right - left;
+            result.height = bottom - top;
+        }
+        for (var i = 0; i < outputs.length; i++){
+            saveAs(outputs[i].path, outputs[i].ext, true);
+        }
+    } finally {
+        merged.close(SaveOptions.DONOTSAVECHANGES);
+        app.activeDocument = doc;
+        app.preferences.rulerUnits = rulerUnits;
+    }
+    return result;
+}
+
+function exportTiles(payload){
+    /**
+     * Exports visible content of active document in tiles.
+     *
+     * Document is cropped to each tile, its visible content is saved as
+     * uncompressed 32 bit TGA copy and crop is reverted in history, so
+     * Photoshop never holds whole canvas in second document or saves it
+     * at once.
+     *
+     * Only 8 bit documents are supported (TGA is 8 bit format), other
+     * bit depths are refused instead of being degraded.
+     *
+     * Args:
+     *      payload (string): json {"output_dir": str, "tile_size": int}
+     * Returns:
+     *      (string) json {"width": int, "height": int,
+     *          "tiles": [{"path": str, "x": int, "y": int,
+     *                     "width": int, "height": int}]}
+     **/
+    var data = JSON.parse(payload);
+    var doc = app.activeDocument;
+    if (doc.bitsPerChannel !== BitsPerChannelType.EIGHT){
+        throw new Error(
+            "Tiled export supports only 8 bit documents, document is " +
+            doc.bitsPerChannel.toString()
+        );
+    }
+    var width = doc.width.as("px");
+    var height = doc.height.as("px");
+    var tileSize = data.tile_size;
+    var result = {"width": width, "height": height, "tiles": []};
+
+    var rulerUnits = app.preferences.rulerUnits;
+    app.preferences.rulerUnits = Units.PIXELS;
+    var uncropped = doc.activeHistoryState;
+    try {
+        var options = new TargaSaveOptions();
+        options.alphaChannels = true;
+        options.resolution = TargaBitsPerPixels.THIRTYTWO;
+        options.rleCompression = false;
+        for (var y = 0; y < height; y += tileSize){
+            for (var x = 0; x < width; x += tileSize){
+                var tileWidth = Math.min(tileSize, width - x);
+                var tileHeight = Math.min(tileSize, height - y);
+                doc.crop([x, y, x + tileWidth, y + tileHeight]);
+                var path = data.output_dir + "/tile_" + y + "_" + x + ".tga";
+                doc.saveAs(new File(path), options, true,
+                           Extension.LOWERCASE);
+                result.tiles.push({
+                    "path": path,
+                    "x": x,
+                    "y": y,
+                    "width": tileWidth,
+                    "height": tileHeight
+                });
+                doc.activeHistoryState = uncropped;
+            }
+        }
+    } finally {
+        doc.activeHistoryState = uncropped;
+        app.preferences.rulerUnits = rulerUnits;
+    }
+    return JSON.stringify(result);
+}
+
+function _descValueToString(container, key, type){
+    /**
+     * Returns string representation of value in ActionDescriptor or
+     * ActionList ('key' is index for list).
+     **/
+    switch (type){
+        case DescValueType.OBJECTTYPE:
+            return _descToString(container.getObjectValue(key));
+        case DescValueType.LISTTYPE:
+            var list = container.getList(key);
+            var items = [];
+            for (var i = 0; i < list.count; i++){
+                items.push(_descValueToString(list, i, list.getType(i)));
+            }
+            return "[" + items.join(",") + "]";
+        case DescValueType.BOOLEANTYPE:
+            return String(container.getBoolean(key));
+        case DescValueType.INTEGERTYPE:
+            return String(container.getInteger(key));
+        case DescValueType.LARGEINTEGERTYPE:
+            return String(container.getLargeInteger(key));
+        case DescValueType.DOUBLETYPE:
+            return String(container.getDouble(key));
+        case DescValueType.UNITDOUBLE:
+            return String(container.getUnitDoubleValue(key));
+        case DescValueType.STRINGTYPE:
+            return container.getString(key);
+        case DescValueType.ENUMERATEDTYPE:
+            return typeIDToStringID(container.getEnumerationValue(key));
+        case DescValueType.ALIASTYPE:
+            return container.getPath(key).fsName;
+        case DescValueType.RAWTYPE:
+            // raw data (embedded smart objects, patterns) might be huge,
+            //   hashing it in ExtendScript blocks Photoshop and sampling
+            //   misses edits, layer is treated as always changed
+            return "raw:" + new Date().getTime() + ":" + Math.random();
+    }
+    return "";
+}
+
+function _descToString(desc){
+    /**
+     * Returns string representation of all values in ActionDescriptor,
+     * position of layer ('itemIndex') is skipped.
+     **/
+    var parts = [];
+    for (var i = 0; i < desc.count; i++){
+        var key = desc.getKey(i);
+        var name = typeIDToStringID(key) || typeIDToCharID(key);
+        if (name == "itemIndex"){
+            continue;
+        }
+        parts.push(
+            name + "=" + _descValueToString(desc, key, desc.getType(key))
+        );
+    }
+    return "{" + parts.join(",") + "}";
+}
+
+function _getCompositeHistogram(doc){
+    var histograms = [doc.histogram.join(",")];
+    for (var i = 0; i < doc.componentChannels.length; i++){
+        histograms.push(doc.componentChannels[i].histogram.join(","));
+    }
+    return histograms.join(";");
+}
+
+function getContentFingerprints(payload){
+    /**
+     * Returns data describing content of layers and isolated composites.
+     *
+     * Every property of each layer descriptor is serialized, so any
+     * change of layer settings, text, smart object, effects or bounds
+     * changes its signature. Pixel changes are caught by histograms of
+     * composite with visibility of each item. Layers with raw descriptor
+     * data (embedded smart objects, patterns) get unique signature, they
+     * are always considered changed.
+     *
+     * Args:
+     *      payload (string): json list of {"name": str,
+     *          "visibility": {layer_id: bool}, "restore": {layer_id: bool}}
+     * Returns:
+     *      (string) json {"layers": {layer_id: signature},
+     *          "histograms": {name: histogram}}
+     **/
+    var items = JSON.parse(payload);
+    var doc = app.activeDocument;
+    var result = {"layers": {}, "histograms": {}};
+
+    var ref = new ActionReference();
+    ref.putEnumerated(charIDToTypeID('Dcmn'), charIDToTypeID('Ordn'),
+                      charIDToTypeID('Trgt'));
+    var count = executeActionGet(ref).getInteger(charIDToTypeID('NmbL'));
+    var idKey = stringIDToTypeID("layerID");
+    for (var i = count; i >= 1; i--){
+        var layerRef = new ActionReference();
+        layerRef.putIndex(charIDToTypeID('Lyr '), i);
+        var desc = executeActionGet(layerRef);
+        result.layers[desc.getInteger(idKey)] = _descToString(desc);
+    }
+
+    for (i = 0; i < items.length; i++){
+        setLayersVisibility(JSON.stringify(items[i].visibility));
+        try {
+            result.histograms[items[i].name] = _getCompositeHistogram(doc);
+        } finally {
+            setLayersVisibility(JSON.stringify(items[i].restore));
+        }
+    }
+    return JSON.stringify(result);
+}
+
 function getHeadline(){
     /**
      *  Returns headline of current document with metadata 
@@ -180,7 +670,9 @@ function getDocumentSettings() {
     var info = {
         resolution: doc.resolution,
         mode: doc.mode.toString(),
-        bitsPerChannel: doc.bitsPerChannel.toString()
+        bitsPerChannel: doc.bitsPerChannel.toString(),
+        width: doc.width.as("px"),
+        height: doc.height.as("px")
     };
     return JSON.stringify(info);
 }
@@ -298,18 +790,21 @@ function saveAs(output_path, ext, as_copy){
 
     try {
         if (
-          doc.bitsPerChannel === BitsPerChannelType.THIRTYTWO
-          && (ext === 'png' || ext === 'jpg' || ext === 'tga')
+          (doc.bitsPerChannel === BitsPerChannelType.THIRTYTWO
+           && (ext === 'png' || ext === 'jpg' || ext === 'tga'))
+          || (doc.bitsPerChannel === BitsPerChannelType.SIXTEEN
+              && (ext === 'jpg' || ext === 'tga'))
         ) {
             // Create a temp duplicate of the document that we convert to 8
-            // bit to avoid a file save prompt for png/jpg/tga
+            // bit to avoid a file save prompt for png/jpg/tga, png keeps
+            // 16 bit
             doc = doc.duplicate();
             is_temp_doc = true;
             doc.bitsPerChannel = BitsPerChannelType.EIGHT;
         }
         if (
-          doc.bitsPerChannel === BitsPerChannelType.SIXTEEN ||
-          doc.bitsPerChannel === BitsPerChannelType.EIGHT
+          (doc.bitsPerChannel === BitsPerChannelType.SIXTEEN ||
+           doc.bitsPerChannel === BitsPerChannelType.EIGHT)
           && (ext === 'exr')
         ) {
             // Create a temp duplicate of the document to enforce 32 bit
@@ -373,6 +868,46 @@ function duplicateDocument(newName) {
     return newDoc.id;
 }
 
+function exportLayerSet(layerSetId, outputPath, mergeLayerSets) {
+    /**
+     * Saves layer set into new document containing only layers of the set.
+     *
+     * Only the layer set is duplicated into new document (same size, mode
+     * and color profile), so the source document is not copied in memory
+     * and no layers need to be deleted. Layer set itself is dissolved in
+     * the new document, which is closed after saving.
+     *
+     * Args:
+     *      layerSetId (int): id of layer set in active document
+     *      outputPath (string): path of saved file, format by extension
+     *      mergeLayerSets (bool): merge layer sets nested in the set
+     **/
+    var srcDoc = app.activeDocument;
+    var desc = new ActionDescriptor();
+    var docRef = new ActionReference();
+    docRef.putClass(charIDToTypeID('Dcmn'));
+    desc.putReference(charIDToTypeID('null'), docRef);
+    desc.putString(charIDToTypeID('Nm  '), decodeURI(new File(outputPath).name));
+    var layerRef = new ActionReference();
+    layerRef.putIdentifier(charIDToTypeID('Lyr '), layerSetId);
+    desc.putReference(charIDToTypeID('Usng'), layerRef);
+    executeAction(charIDToTypeID('Mk  '), desc, DialogModes.NO);
+
+    var newDoc = app.activeDocument;
+    try {
+        var layerSetCopyId = newDoc.layers[0].id;
+        if (mergeLayerSets) {
+            mergeAllLayerSets(layerSetCopyId);
+        }
+        dissolveLayerSet(layerSetCopyId);
+        var ext = outputPath.split('.').pop().toLowerCase();
+        saveAs(outputPath, ext, false);
+    } finally {
+        newDoc.close(SaveOptions.DONOTSAVECHANGES);
+        app.activeDocument = srcDoc;
+    }
+}
+
 /**
  * Close document with given ID
  * If no ID is provided, close the active document.
@@ -448,6 +983,124 @@ function imprint(payload){
     app.activeDocument.info.headline = payload;
 }
 
+var AYON_XMP_NAMESPACE = "http://ynput.io/ayon/photoshop/metadata/1.0/";
+var AYON_XMP_PREFIX = "ayonMeta:";
+// property listing keys of all stored metadata items
+var AYON_XMP_ORDER_KEY = "itemKeys";
+
+function _getAyonXmp(doc){
+    /**
+     * Returns XMPMeta of 'doc' with AYON metadata namespace registered.
+     **/
+    if (!ExternalObject.AdobeXMPScript){
+        ExternalObject.AdobeXMPScript = new ExternalObject(
+            "lib:AdobeXMPScript"
+        );
+    }
+    XMPMeta.registerNamespace(AYON_XMP_NAMESPACE, AYON_XMP_PREFIX);
+    return new XMPMeta(doc.xmpMetadata.rawData);
+}
+
+function _getXmpItemKeys(xmp){
+    var prop = xmp.getProperty(AYON_XMP_NAMESPACE, AYON_XMP_ORDER_KEY);
+    if (!prop || !prop.value){
+        return [];
+    }
+    return String(prop.value).split(",");
+}
+
+function readMetadata(keys){
+    /**
+     * Returns metadata items stored in AYON XMP namespace.
+     *
+     * Each item is stored in separate property (compressed on server
+     * side), only items with 'keys' are returned if provided. Content of
+     * Headline is returned instead if document doesn't contain any item in
+     * XMP (legacy storage).
+     *
+     * Args:
+     *      keys (array): keys of items to return, all items if null
+     * Returns:
+     *      (string) json {"source": "xmp", "order": [keys],
+     *          "items": {key: value}} or
+     *          {"source": "headline", "headline": value}
+     **/
+    var result = {"source": "headline", "headline": ""};
+    if (documents.length == 0){
+        return JSON.stringify(result);
+    }
+    var doc = app.activeDocument;
+    var order = [];
+    var xmp = null;
+    try {
+        xmp = _getAyonXmp(doc);
+        order = _getXmpItemKeys(xmp);
+    } catch (e) {
+        log.warn("Cannot read XMP metadata: " + e.message);
+    }
+    if (order.length == 0){
+        result.headline = doc.info.headline;
+        return JSON.stringify(result);
+    }
+
+    result = {"source": "xmp", "order": order, "items": {}};
+    var wanted = keys || order;
+    for (var i = 0; i < wanted.length; i++){
+        var prop = xmp.getProperty(AYON_XMP_NAMESPACE, wanted[i]);
+        if (prop){
+            result.items[wanted[i]] = String(prop.value);
+        }
+    }
+    return JSON.stringify(result);
+}
+
+function writeMetadata(payload){
+    /**
+     * Writes metadata items to AYON XMP namespace.
+     *
+     * Args:
+     *      payload (string): json {
+     *          "items": {key: value} - changed items to set,
+     *          "order": [keys] - keys of all items, items not listed are
+     *              removed, everything in namespace is removed if null,
+     *          "headline": string - replaces Headline if not null
+     *      }
+     **/
+    var data = JSON.parse(payload);
+    var doc = app.activeDocument;
+    var xmp = _getAyonXmp(doc);
+    var oldKeys = _getXmpItemKeys(xmp);
+    var order = data.order || [];
+    var keep = {};
+    for (var i = 0; i < order.length; i++){
+        keep[order[i]] = true;
+    }
+    for (i = 0; i < oldKeys.length; i++){
+        if (!keep[oldKeys[i]]){
+            xmp.deleteProperty(AYON_XMP_NAMESPACE, oldKeys[i]);
+        }
+    }
+    var items = data.items || {};
+    for (var key in items){
+        if (items.hasOwnProperty(key)){
+            xmp.setProperty(AYON_XMP_NAMESPACE, key, items[key]);
+        }
+    }
+    if (order.length){
+        xmp.setProperty(
+            AYON_XMP_NAMESPACE, AYON_XMP_ORDER_KEY, order.join(",")
+        );
+    } else {
+        xmp.deleteProperty(AYON_XMP_NAMESPACE, AYON_XMP_ORDER_KEY);
+    }
+    doc.xmpMetadata.rawData = xmp.serialize(
+        XMPConst.SERIALIZE_OMIT_PACKET_WRAPPER
+    );
+    if (data.headline !== null && data.headline !== undefined){
+        doc.info.headline = data.headline;
+    }
+}
+
 function getSelectedLayers(doc) {
     /**
      * Returns json representation of currently selected layers.
@@ -708,6 +1361,127 @@ function deleteLayer(layer_id){
     executeAction(stringIDToTypeID("delete"), d, DialogModes.NO);
 }
 
+function deleteLayers(layerIds){
+    /***
+     * Deletes all layers with ids in single step of history
+     *
+     * layerIds (string): json list of layer ids (int)
+     **/
+    var ids = JSON.parse(layerIds);
+    if (!ids.length){
+        return;
+    }
+    _runInHistoryState("Delete layers", function(){
+        _deleteLayersByIds(ids);
+    });
+}
+
+function _deleteLayersByIds(ids){
+    // select all layers at once and delete the selection
+    var selectDesc = new ActionDescriptor();
+    var selectRef = new ActionReference();
+    for (var i = 0; i < ids.length; i++){
+        selectRef.putIdentifier(charIDToTypeID("Lyr "), ids[i]);
+    }
+    selectDesc.putReference(charIDToTypeID("null"), selectRef);
+    selectDesc.putBoolean(charIDToTypeID("MkVs"), false);
+    executeAction(charIDToTypeID("slct"), selectDesc, DialogModes.NO);
+
+    var deleteDesc = new ActionDescriptor();
+    var deleteRef = new ActionReference();
+    deleteRef.putEnumerated(charIDToTypeID("Lyr "), charIDToTypeID("Ordn"),
+                            charIDToTypeID("Trgt"));
+    deleteDesc.putReference(charIDToTypeID("null"), deleteRef);
+    executeAction(charIDToTypeID("Dlt "), deleteDesc, DialogModes.NO);
+}
+
+// functions without return value which could be called by 'runBatch'
+var BATCH_FUNCTIONS = {
+    "setVisible": setVisible,
+    "setLayersVisibility": setLayersVisibility,
+    "renameLayer": renameLayer,
+    "deleteLayer": deleteLayer,
+    "deleteLayers": deleteLayers,
+    "selectLayers": selectLayers,
+    "dissolveLayerSet": dissolveLayerSet,
+    "imprint": imprint,
+    "writeMetadata": writeMetadata
+};
+
+function runBatch(payload, historyName){
+    /***
+     * Runs multiple queued calls in single evalScript
+     *
+     * Args:
+     *    payload(str): json list of {"func": name, "args": [..]}
+     *    historyName(str): if set, all calls create single history state
+     *        with this name
+     *
+     * Returns json list of error messages for calls that failed, failed
+     * call doesn't stop remaining calls.
+     **/
+    var calls = JSON.parse(payload);
+    var errors;
+    if (historyName){
+        errors = _runInHistoryState(historyName, function(){
+            return _runBatchCalls(calls);
+        });
+    } else {
+        errors = _runBatchCalls(calls);
+    }
+    return JSON.stringify(errors);
+}
+
+function _runBatchCalls(calls){
+    var errors = [];
+    for (var i = 0; i < calls.length; i++) {
+        var call = calls[i];
+        var func = BATCH_FUNCTIONS[call.func];
+        if (!func) {
+            errors.push("Function '" + call.func + "' cannot be batched");
+            continue;
+        }
+        try {
+            func.apply(null, call.args);
+        } catch (e) {
+            errors.push(call.func + ": " + e.message);
+        }
+    }
+    return errors;
+}
+
+// true while code runs inside of 'suspendHistory'
+var _historySuspended = false;
+
+function _runInHistoryState(name, callback){
+    /***
+     * Runs 'callback' so all its changes create single history state
+     *
+     * 'suspendHistory' evaluates code in string, callback and its result
+     * are passed through globals. Nested calls run callback directly, they
+     * are part of outer history state.
+     *
+     * Returns result of callback
+     **/
+    if (_historySuspended || !app.documents.length){
+        return callback();
+    }
+    $.global._ayonHistoryCallback = callback;
+    $.global._ayonHistoryResult = undefined;
+    _historySuspended = true;
+    try {
+        app.activeDocument.suspendHistory(
+            name,
+            "$.global._ayonHistoryResult = $.global._ayonHistoryCallback();"
+        );
+        return $.global._ayonHistoryResult;
+    } finally {
+        _historySuspended = false;
+        $.global._ayonHistoryCallback = undefined;
+        $.global._ayonHistoryResult = undefined;
+    }
+}
+
 function _undo() {
     executeAction(charIDToTypeID("undo", undefined, DialogModes.NO));
 };
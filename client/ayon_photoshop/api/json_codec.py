@@ -0,0 +1,72 @@
+"""JSON codec used for payloads sent to and received from Photoshop.
+
+Uses 'orjson' when it is available in the Python environment, falls back to
+stdlib 'json' otherwise. Both backends produce the same compact output
+('separators' without whitespace, non ASCII characters escaped) so payloads
+are interchangeable between them.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSONDecodeError = json.JSONDecodeError
+
+_COMPACT_SEPARATORS = (",", ":")
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, separators=_COMPACT_SEPARATORS)
+
+
+def _stdlib_loads(value):
+    return json.loads(value)
+
+
+def _orjson_dumps(data):
+    # keys are converted to strings same way as stdlib does
+    result = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    # payload is embedded into ExtendScript string literal, keep it ASCII
+    #   as stdlib does (escapes non ASCII characters)
+    if not result.isascii():
+        return _stdlib_dumps(data)
+    return result.decode("ascii")
+
+
+def _orjson_loads(value):
+    return orjson.loads(value)
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+    _dumps = _orjson_dumps
+    _loads = _orjson_loads
+else:
+    BACKEND = "json"
+    _dumps = _stdlib_dumps
+    _loads = _stdlib_loads
+
+
+def dumps(data):
+    """Serializes 'data' to compact JSON string.
+
+    Args:
+        data (Any): JSON serializable data, non string dictionary keys are
+            converted to strings
+
+    Returns:
+        str
+    """
+    return _dumps(data)
+
+
+def loads(value):
+    """Parses JSON string (or bytes).
+
+    Raises:
+        JSONDecodeError: when 'value' is not valid JSON
+    """
+    return _loads(value)
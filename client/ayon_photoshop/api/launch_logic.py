@@ -26,7 +26,7 @@ from ayon_core.tools.utils import host_tools
 from ayon_core.pipeline.context_tools import change_current_context
 
 from .webserver import WebServerTool
-from .ws_stub import PhotoshopServerStub
+from .ws_stub import PhotoshopServerStub, AsyncPhotoshopServerStub
 
 log = Logger.get_logger(__name__)
 
@@ -108,6 +108,20 @@ def stub():
     return ps_stub
 
 
+def async_stub():
+    """Convenience function to get asyncio variant of server RPC stub.
+
+    Same as 'stub' but methods are coroutines which could be awaited
+    together to overlap round trips to Photoshop.
+    :return: <AsyncPhotoshopServerStub>
+    """
+    ps_stub = AsyncPhotoshopServerStub()
+    if not ps_stub.client:
+        raise ConnectionNotEstablishedYet("Connection is not created yet")
+
+    return ps_stub
+
+
 def show_tool_by_name(tool_name):
     kwargs = {}
     if tool_name == "loader":
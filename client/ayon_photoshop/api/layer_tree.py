@@ -0,0 +1,190 @@
+"""Indexed view over layers of Photoshop document.
+
+'PhotoshopServerStub.get_layers' returns flat list of PSItem, 'LayerTree'
+indexes it once so lookups by id, parent, children, instance id and
+ancestor or descendant queries don't need to scan the whole list again.
+"""
+
+
+class LayerTree:
+    """Layers of active document indexed for fast queries.
+
+    Tree is built from flat list of layers in document order (top to
+    bottom). All indexes are precomputed on creation, tree should be treated
+    as immutable snapshot, get new one from stub after layers changed.
+
+    Args:
+        layers (list[PSItem]): layers as returned by 'stub.get_layers'
+        layers_meta (list[dict]): optional metadata from Headline
+            ('stub.get_layers_metadata'), used to index layers by
+            instance id
+    """
+
+    def __init__(self, layers, layers_meta=None):
+        self._layers = list(layers)
+        self._by_id = {}
+        self._children = {None: []}
+        self._descendants = {}
+        self._by_instance_id = {}
+
+        for layer in self._layers:
+            self._by_id[layer.id] = layer
+
+        # ancestors are walked by 'parent_id', 'PSItem.parents' would
+        #   create list of parents on each item
+        for layer in self._layers:
+            self._children.setdefault(layer.parent_id, []).append(layer)
+            for ancestor_id in self._iter_ancestor_ids(layer):
+                self._descendants.setdefault(ancestor_id, set()).add(
+                    layer.id
+                )
+
+        if layers_meta:
+            self._index_instances(layers_meta)
+
+    def __iter__(self):
+        return iter(self._layers)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __contains__(self, layer_id):
+        return self._normalize_id(layer_id) in self._by_id
+
+    @property
+    def layers(self):
+        """All layers in document order.
+
+        Returns:
+            list[PSItem]
+        """
+        return list(self._layers)
+
+    def with_metadata(self, layers_meta):
+        """Returns tree sharing indexes of this one, indexed by instance ids.
+
+        Args:
+            layers_meta (list[dict]): metadata from Headline
+
+        Returns:
+            LayerTree
+        """
+        tree = LayerTree.__new__(LayerTree)
+        tree._layers = self._layers
+        tree._by_id = self._by_id
+        tree._children = self._children
+        tree._descendants = self._descendants
+        tree._by_instance_id = {}
+        tree._index_instances(layers_meta)
+        return tree
+
+    def get(self, layer_id):
+        """Returns layer with 'layer_id' or None if not found.
+
+        Args:
+            layer_id (Union[int, str]): layer id, string ids (as stored in
+                metadata 'members') are accepted too
+        """
+        return self._by_id.get(self._normalize_id(layer_id))
+
+    def get_by_instance_id(self, instance_id):
+        """Returns layer (group) of publish instance or None if not found.
+
+        Tree must be created with metadata (or 'with_metadata').
+        """
+        return self._by_instance_id.get(instance_id)
+
+    def parent(self, layer_id):
+        """Returns immediate parent group of layer or None for top level."""
+        layer = self.get(layer_id)
+        if layer is None or layer.parent_id is None:
+            return None
+        return self._by_id.get(layer.parent_id)
+
+    def children(self, layer_id=None):
+        """Returns immediate children of group, top level layers for None.
+
+        Returns:
+            list[PSItem]
+        """
+        if layer_id is not None:
+            layer_id = self._normalize_id(layer_id)
+        return list(self._children.get(layer_id, []))
+
+    def ancestor_ids(self, layer_id):
+        """Returns ids of groups containing layer, from top level down.
+
+        Returns:
+            tuple[int]
+        """
+        layer = self.get(layer_id)
+        if layer is None:
+            return tuple()
+        return tuple(reversed(list(self._iter_ancestor_ids(layer))))
+
+    def path_ids(self, layer_id):
+        """Returns ids of all ancestors and layer itself.
+
+        Returns:
+            tuple[int]
+        """
+        layer = self.get(layer_id)
+        if layer is None:
+            return tuple()
+        return self.ancestor_ids(layer.id) + (layer.id,)
+
+    def descendant_ids(self, layer_id):
+        """Returns ids of all layers nested in group with 'layer_id'.
+
+        Returns:
+            frozenset[int]
+        """
+        return frozenset(
+            self._descendants.get(self._normalize_id(layer_id), ())
+        )
+
+    def get_layers_in_layers(self, layer_ids):
+        """Returns layers with 'layer_ids' and all layers nested in them.
+
+        Args:
+            layer_ids (Iterable[int]): ids of layers (might be groups)
+
+        Returns:
+            list[PSItem]: in document order
+        """
+        ids = set()
+        for layer_id in layer_ids:
+            layer_id = self._normalize_id(layer_id)
+            if layer_id not in self._by_id:
+                continue
+            ids.add(layer_id)
+            ids.update(self._descendants.get(layer_id, ()))
+        return [layer for layer in self._layers if layer.id in ids]
+
+    def _iter_ancestor_ids(self, layer):
+        """Yields ids of groups containing 'layer', from immediate parent."""
+        parent_id = layer.parent_id
+        while parent_id is not None:
+            yield parent_id
+            parent = self._by_id.get(parent_id)
+            if parent is None:
+                break
+            parent_id = parent.parent_id
+
+    def _index_instances(self, layers_meta):
+        for item in layers_meta:
+            instance_id = item.get("instance_id") or item.get("uuid")
+            members = item.get("members")
+            if not instance_id or not members:
+                continue
+            layer = self.get(members[0])
+            if layer is not None:
+                self._by_instance_id[instance_id] = layer
+
+    def _normalize_id(self, layer_id):
+        if isinstance(layer_id, str):
+            try:
+                return int(layer_id)
+            except ValueError:
+                return layer_id
+        return layer_id
@@ -5,13 +5,18 @@ import traceback
 import functools
 import pyblish
 
-from ayon_core.lib import env_value_to_bool, Logger, is_in_tests
+from ayon_core.lib import (
+    env_value_to_bool,
+    Logger,
+    is_in_tests,
+)
 from ayon_core.addon import AddonsManager
 from ayon_core.pipeline import install_host
 from ayon_core.tools.utils import host_tools
 from ayon_core.tools.utils import get_ayon_qt_app
 
 from .launch_logic import ProcessLauncher, stub
+from .layer_tree import LayerTree
 
 log = Logger.get_logger(__name__)
 
@@ -83,79 +88,83 @@ def maintained_selection():
         stub().select_layers(selection)
 
 
-def _get_layers_by_parent(all_layers):
-    """Group layers by their immediate parent ID."""
-    by_parent = {None: []}
-    for layer in all_layers:
-        parent_id = layer.parents[-1] if layer.parents else None
-        if parent_id not in by_parent:
-            by_parent[parent_id] = []
-        by_parent[parent_id].append(layer)
-    return by_parent
+def get_isolated_visibility(tree, layer_ids):
+    """Returns visibility changes showing only layers and their ancestors.
 
-
-@contextlib.contextmanager
-def isolated_layers_visibility(stub, layer_ids, all_layers=None):
-    """Show only the specified layers and their ancestor paths, hiding all siblings.
-    
-    Similar to isolated_instance_visibility but supports multiple layer IDs.
-    All specified layers and their ancestors will be visible simultaneously.
-    
     Args:
-        stub: PhotoshopServerStub
+        tree (LayerTree): layers of document
         layer_ids: List of layer IDs to show (can be single layer or multiple)
-        all_layers: Optional list of PSItem layers (fetched if not provided)
-    
-    Tracks original visibility and restores it on exit.
+
+    Returns:
+        tuple[dict, dict]: {layer_id: visible} to isolate layers and
+            {layer_id: visible} with original state of changed layers, both
+            empty if no layer was found
     """
-    if all_layers is None:
-        all_layers = stub.get_layers()
-    
     # Normalize to list if single ID provided
     if not isinstance(layer_ids, (list, tuple, set)):
         layer_ids = [layer_ids]
-    
-    layers_by_id = {layer.id: layer for layer in all_layers}
-    layers_by_parent = _get_layers_by_parent(all_layers)
-    
+
     # Build paths from all target layers to top-level
     path_ids = set()
     for layer_id in layer_ids:
-        current = layers_by_id.get(layer_id)
-        if not current:
-            continue  # Skip if layer not found
-        while current:
-            path_ids.add(current.id)
-            current = layers_by_id.get(current.parents[-1]) if current.parents else None
-
-    if not path_ids:
-        yield  # No-op if no valid layers found
-        return
+        path_ids.update(tree.path_ids(layer_id))
 
     # Record original visibility and build change map
     original_visibility = {}
     visibility_changes = {}
-    
+
     for layer_id in path_ids:
-        layer = layers_by_id.get(layer_id)
-        if not layer:
-            continue
-        parent_id = layer.parents[-1] if layer.parents else None
-        for sibling in layers_by_parent.get(parent_id, []):
+        ancestor_ids = tree.ancestor_ids(layer_id)
+        parent_id = ancestor_ids[-1] if ancestor_ids else None
+        for sibling in tree.children(parent_id):
             # Record original state before any changes
             if sibling.id not in original_visibility:
                 original_visibility[sibling.id] = sibling.visible
             # Path layers visible, siblings hidden
             visibility_changes[sibling.id] = sibling.id in path_ids
+    return visibility_changes, original_visibility
 
-    try:
-        if visibility_changes:
-            stub.set_layers_visibility(visibility_changes)
-        yield
-    finally:
-        # Restore original visibility state
-        if original_visibility:
-            stub.set_layers_visibility(original_visibility)
+
+@contextlib.contextmanager
+def isolated_layers_visibility(stub, layer_ids, all_layers=None):
+    """Show only the specified layers and their ancestor paths, hiding all siblings.
+    
+    Similar to isolated_instance_visibility but supports multiple layer IDs.
+    All specified layers and their ancestors will be visible simultaneously.
+    
+    Args:
+        stub: PhotoshopServerStub
+        layer_ids: List of layer IDs to show (can be single layer or multiple)
+        all_layers: Optional LayerTree or list of PSItem layers (fetched if
+            not provided)
+    
+    Tracks original visibility and restores it on exit. Changes are
+    grouped in history by 'stub.transaction'.
+    """
+    if all_layers is None:
+        tree = stub.get_layer_tree()
+    elif isinstance(all_layers, LayerTree):
+        tree = all_layers
+    else:
+        tree = LayerTree(all_layers)
+
+    visibility_changes, original_visibility = get_isolated_visibility(
+        tree, layer_ids
+    )
+    if not visibility_changes:
+        yield  # No-op if no valid layers found
+        return
+
+    # isolation and restore don't create history states for each layer
+    with stub.transaction("Isolate layers"):
+        try:
+            if visibility_changes:
+                stub.set_layers_visibility(visibility_changes)
+            yield
+        finally:
+            # Restore original visibility state
+            if original_visibility:
+                stub.set_layers_visibility(original_visibility)
 
 
 def find_close_plugin(close_plugin_name, log):
@@ -0,0 +1,245 @@
+"""In memory copy of metadata stored in Headline of Photoshop document.
+
+'PhotoshopServerStub.imprint' reads whole Headline, modifies single item and
+writes everything back. 'MetadataStore' keeps parsed items indexed by
+instance id and member (layer) id, so modifications are applied in memory
+and whole metadata is serialized only once when store is flushed (see
+'PhotoshopServerStub.metadata_transaction').
+
+Metadata could be stored in legacy Headline as single JSON list or in AYON
+XMP namespace where each item is zlib compressed, base64 encoded and stored
+under its own key (see 'get_item_key'), so only changed items are written
+and single item could be read without parsing all of them.
+"""
+import base64
+import copy
+import re
+import zlib
+
+from . import json_codec
+
+METADATA_SOURCE_HEADLINE = "headline"
+METADATA_SOURCE_XMP = "xmp"
+
+
+def get_item_key(item):
+    """Returns key of metadata item in XMP storage.
+
+    Items are keyed by first member (layer) id so item of a layer could be
+    read directly, items without members by 'instance_id' or 'id'.
+
+    Args:
+        item (dict): metadata item
+
+    Returns:
+        str: valid XML name
+    """
+    if item.get("members"):
+        key = "layer_{}".format(item["members"][0])
+    elif item.get("instance_id") or item.get("uuid"):
+        key = "instance_{}".format(item.get("instance_id") or item["uuid"])
+    else:
+        key = "item_{}".format(item.get("id") or "")
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+def encode_item(item):
+    """Returns compressed representation of metadata item.
+
+    Returns:
+        str
+    """
+    data = json_codec.dumps(item).encode("utf-8")
+    return base64.b64encode(zlib.compress(data, 9)).decode("ascii")
+
+
+def decode_item(value):
+    """Returns metadata item from 'encode_item' output.
+
+    Raises:
+        ValueError: value cannot be decoded
+    """
+    try:
+        data = zlib.decompress(base64.b64decode(value))
+        return json_codec.loads(data)
+    except (zlib.error, ValueError) as exc:
+        raise ValueError(
+            "{} cannot be decoded, recreate meta ({})".format(value, exc)
+        )
+
+
+class MetadataStore:
+    """Metadata items of active document indexed for updates.
+
+    Items are matched same way as by 'imprint', by id of first member
+    (layer) or by 'instance_id'.
+
+    Args:
+        items (list[dict]): parsed metadata items from Headline
+        source (str): storage items were read from ('headline' or 'xmp'),
+            None if unknown
+        shards (dict): {key: encoded item} as read from XMP storage, used
+            to write only changed items
+    """
+
+    def __init__(self, items, source=None, shards=None):
+        self._items = []
+        self._by_key = {}
+        self._dirty = False
+        self.source = source
+        self.shards = shards or {}
+        for item in items:
+            self._add(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def is_dirty(self):
+        """Store was modified since it was created or last serialized."""
+        return self._dirty
+
+    def items(self):
+        """Returns copy of all items, modifications don't affect store.
+
+        Returns:
+            list[dict]
+        """
+        return copy.deepcopy(self._items)
+
+    def get(self, item_id):
+        """Returns copy of first item matching 'item_id' or None.
+
+        Args:
+            item_id (Union[str, int]): id of first member or instance id
+        """
+        items = self._by_key.get(str(item_id))
+        if not items:
+            return None
+        return copy.deepcopy(items[0])
+
+    def update(self, item_id, data):
+        """Updates items matching 'item_id' with 'data'.
+
+        Matching items are removed when 'data' are empty, 'data' are added
+        as new item if nothing matches.
+
+        Args:
+            item_id (Union[str, int]): id of first member or instance id
+            data (dict): metadata to store
+        """
+        # json serialization writes integer values in a dictionary to
+        # string, so anticipating it here.
+        items = self._by_key.get(str(item_id))
+        if not items:
+            if data:
+                self._add(copy.deepcopy(data))
+                self._dirty = True
+            return
+
+        self._dirty = True
+
+        for item in list(items):
+            if data:
+                self._unindex(item)
+                item.update(copy.deepcopy(data))
+                self._index(item)
+            else:
+                self._remove(item)
+
+    def remove_instance(self, instance_id):
+        """Removes all items of publish instance.
+
+        Args:
+            instance_id (str): 'instance_id' (or legacy 'uuid') of instance
+        """
+        for item in list(self._items):
+            inst_id = item.get("instance_id") or item.get("uuid")
+            if inst_id == instance_id:
+                self._remove(item)
+                self._dirty = True
+
+    def serialize(self, layer_ids=None):
+        """Returns JSON payload to be stored in Headline.
+
+        Args:
+            layer_ids (Iterable[int]): ids of existing layers, items of
+                missing members are skipped if provided
+
+        Returns:
+            str
+        """
+        self._dirty = False
+        return json_codec.dumps(self._filter_items(layer_ids))
+
+    def serialize_shards(self, layer_ids=None):
+        """Returns items encoded for XMP storage.
+
+        Args:
+            layer_ids (Iterable[int]): ids of existing layers, items of
+                missing members are skipped if provided
+
+        Returns:
+            tuple[list[str], dict]: keys of all items in order and
+                {key: encoded item} of items changed since store was read
+        """
+        order = []
+        used_keys = set()
+        changed = {}
+        for item in self._filter_items(layer_ids):
+            key = base_key = get_item_key(item)
+            idx = 1
+            while key in used_keys:
+                key = "{}_{}".format(base_key, idx)
+                idx += 1
+            used_keys.add(key)
+            order.append(key)
+            value = encode_item(item)
+            if self.shards.get(key) != value:
+                changed[key] = value
+        self._dirty = False
+        return order, changed
+
+    def _filter_items(self, layer_ids):
+        if layer_ids is None:
+            return list(self._items)
+        layer_ids = set(layer_ids)
+        return [
+            item
+            for item in self._items
+            if not item.get("members")
+            or int(item["members"][0]) in layer_ids
+        ]
+
+    def _add(self, item):
+        self._items.append(item)
+        self._index(item)
+
+    def _remove(self, item):
+        self._unindex(item)
+        for idx, stored_item in enumerate(self._items):
+            if stored_item is item:
+                self._items.pop(idx)
+                break
+
+    def _get_keys(self, item):
+        keys = set()
+        if item.get("members"):
+            keys.add(str(item["members"][0]))
+        if item.get("instance_id"):
+            keys.add(item["instance_id"])
+        return keys
+
+    def _index(self, item):
+        for key in self._get_keys(item):
+            self._by_key.setdefault(key, []).append(item)
+
+    def _unindex(self, item):
+        for key in self._get_keys(item):
+            items = self._by_key.get(key, [])
+            for idx, stored_item in enumerate(items):
+                if stored_item is item:
+                    items.pop(idx)
+                    break
+            if not items:
+                self._by_key.pop(key, None)
@@ -0,0 +1,229 @@
+"""Stitching of tiles exported from very large documents.
+
+Saving of whole canvas of huge (PSB) documents allocates full canvas
+buffers in Photoshop, which often fails on memory. Such documents are
+exported by Photoshop in tiles (uncompressed 32 bit TGA, see
+'exportTiles' in 'index.jsx') which are stitched here into single image.
+
+Stitching reads tiles scanline by scanline, memory usage is bounded by one
+scanline of output image and compressor buffer, not by canvas size.
+"""
+import os
+import struct
+import zlib
+
+# formats which could be stitched from tiles, other formats are converted
+#   from stitched image
+STITCHED_EXTENSIONS = ("png", "tga")
+
+_TGA_HEADER = struct.Struct("<BBBHHBHHHHBB")
+# uncompressed true color image
+_TGA_TRUE_COLOR = 2
+# 'descriptor' bit of image stored from top to bottom
+_TGA_TOP_ORIGIN = 0x20
+_TGA_MAX_SIZE = 0xFFFF
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# size of compressed data written to one IDAT chunk
+_PNG_CHUNK_SIZE = 1024 * 1024
+
+
+class TGATile:
+    """Reads scanlines of uncompressed TGA tile.
+
+    Scanlines are read from file on demand, returned as BGRA. Header values
+    ('data_offset', 'pixel_size', 'top_origin') allow mapping of pixel data
+    directly.
+
+    Args:
+        path (str): path to tile
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stream = open(path, "rb")
+        try:
+            self._read_header()
+        except Exception:
+            self._stream.close()
+            raise
+
+    def _read_header(self):
+        header = self._stream.read(_TGA_HEADER.size)
+        if len(header) != _TGA_HEADER.size:
+            raise ValueError(f"Tile {self.path} is not TGA file")
+        (
+            id_length, color_map_type, image_type,
+            _, color_map_length, color_map_depth,
+            _, _, width, height, depth, descriptor
+        ) = _TGA_HEADER.unpack(header)
+        if image_type != _TGA_TRUE_COLOR or depth not in (24, 32):
+            raise ValueError(
+                f"Tile {self.path} is not uncompressed 24 or 32 bit TGA"
+            )
+        color_map_size = 0
+        if color_map_type:
+            color_map_size = color_map_length * ((color_map_depth + 7) // 8)
+
+        self.width = width
+        self.height = height
+        self.pixel_size = depth // 8
+        self.top_origin = bool(descriptor & _TGA_TOP_ORIGIN)
+        self.data_offset = _TGA_HEADER.size + id_length + color_map_size
+
+    def read_row(self, y):
+        """Returns BGRA scanline 'y' (from top) of tile.
+
+        Returns:
+            bytearray
+        """
+        row_size = self.width * self.pixel_size
+        if not self.top_origin:
+            y = self.height - 1 - y
+        self._stream.seek(self.data_offset + y * row_size)
+        data = self._stream.read(row_size)
+        if len(data) != row_size:
+            raise ValueError(f"Tile {self.path} is truncated")
+        if self.pixel_size == 4:
+            return bytearray(data)
+        # no alpha, make it opaque
+        row = bytearray(b"\xff" * (self.width * 4))
+        row[0::4] = data[0::3]
+        row[1::4] = data[1::3]
+        row[2::4] = data[2::3]
+        return row
+
+    def close(self):
+        self._stream.close()
+
+
+class _PNGWriter:
+    """Writes 8 bit RGBA PNG scanline by scanline."""
+
+    def __init__(self, stream, width, height, compression):
+        self._stream = stream
+        self._compressor = zlib.compressobj(compression)
+        self._buffer = []
+        self._buffer_size = 0
+        stream.write(_PNG_SIGNATURE)
+        self._write_chunk(
+            b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        )
+
+    def _write_chunk(self, chunk_type, data):
+        self._stream.write(struct.pack(">I", len(data)))
+        self._stream.write(chunk_type)
+        self._stream.write(data)
+        crc = zlib.crc32(data, zlib.crc32(chunk_type))
+        self._stream.write(struct.pack(">I", crc & 0xFFFFFFFF))
+
+    def _add_data(self, data):
+        if not data:
+            return
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        if self._buffer_size >= _PNG_CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._write_chunk(b"IDAT", b"".join(self._buffer))
+        self._buffer = []
+        self._buffer_size = 0
+
+    def write_row(self, bgra_row):
+        rgba_row = bytearray(bgra_row)
+        rgba_row[0::4] = bgra_row[2::4]
+        rgba_row[2::4] = bgra_row[0::4]
+        # each scanline starts with filter type, 0 - no filter
+        self._add_data(self._compressor.compress(b"\x00"))
+        self._add_data(self._compressor.compress(rgba_row))
+
+    def close(self):
+        self._add_data(self._compressor.flush())
+        self._flush()
+        self._write_chunk(b"IEND", b"")
+
+
+class TGAWriter:
+    """Writes uncompressed 32 bit TGA scanline by scanline."""
+
+    def __init__(self, stream, width, height):
+        if width > _TGA_MAX_SIZE or height > _TGA_MAX_SIZE:
+            raise ValueError(
+                f"Image {width}x{height} is too large for TGA format"
+            )
+        self._stream = stream
+        stream.write(_TGA_HEADER.pack(
+            0, 0, _TGA_TRUE_COLOR, 0, 0, 0, 0, 0, width, height, 32,
+            _TGA_TOP_ORIGIN | 8
+        ))
+
+    def write_row(self, bgra_row):
+        self._stream.write(bgra_row)
+
+    def close(self):
+        pass
+
+
+def stitch_tiles(tiles, width, height, dst_path, extension, compression=6):
+    """Stitches tiles into single image.
+
+    Tiles are expected to form regular grid, all tiles in one row have
+    same 'y' and height.
+
+    Args:
+        tiles (list[dict]): {"path": str, "x": int, "y": int} of TGA tiles
+            (as returned by 'stub.export_tiles')
+        width (int): width of output image
+        height (int): height of output image
+        dst_path (str): output path
+        extension (str): output format, one of 'STITCHED_EXTENSIONS'
+        compression (int): zlib compression level for PNG
+    """
+    if extension not in STITCHED_EXTENSIONS:
+        raise ValueError(f"Tiles cannot be stitched to '{extension}'")
+
+    tile_rows = {}
+    for tile in tiles:
+        tile_rows.setdefault(tile["y"], []).append(tile)
+
+    with open(dst_path, "wb") as stream:
+        if extension == "png":
+            writer = _PNGWriter(stream, width, height, compression)
+        else:
+            writer = TGAWriter(stream, width, height)
+
+        row_size = width * 4
+        written_rows = 0
+        for tile_y in sorted(tile_rows):
+            # only one row of tiles is open at once
+            opened = []
+            try:
+                for tile in sorted(tile_rows[tile_y], key=lambda t: t["x"]):
+                    opened.append((tile["x"], TGATile(tile["path"])))
+                tile_height = opened[0][1].height
+                for y in range(tile_height):
+                    row = bytearray(row_size)
+                    for x, tile in opened:
+                        start = x * 4
+                        tile_row = tile.read_row(y)
+                        row[start:start + len(tile_row)] = tile_row
+                    writer.write_row(row[:row_size])
+                written_rows += tile_height
+            finally:
+                for _, tile in opened:
+                    tile.close()
+
+        if written_rows != height:
+            raise ValueError(
+                f"Tiles contain {written_rows} rows, expected {height}"
+            )
+        writer.close()
+
+
+def remove_tiles(tiles):
+    """Removes tile files exported by 'stub.export_tiles'."""
+    for tile in tiles:
+        if os.path.exists(tile["path"]):
+            os.remove(tile["path"])
@@ -0,0 +1,286 @@
+"""Conversion of images extracted from Photoshop into other formats.
+
+Saving each format from Photoshop flattens the whole document again, images
+are instead saved once in lossless format and other formats are converted
+from it by 'oiiotool' outside of Photoshop.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ayon_core.lib import get_oiio_tool_args, run_subprocess
+from ayon_core.lib.transcoding import get_oiio_info_for_input
+
+# format written by Photoshop, keeps bit depth of 8 and 16 bit documents
+MASTER_EXTENSION = "png"
+
+# 'oiiotool' arguments flattening master with alpha to match Photoshop
+OIIO_MATTE_ARGS = {
+    # Photoshop flattens JPG on white background
+    "jpg": [
+        "--pattern", "constant:color=1,1,1,1",
+        "{TOP.width}x{TOP.height}", "4",
+        "--over",
+    ],
+}
+
+# 'oiiotool' arguments applied on loaded master to match Photoshop output
+OIIO_CONVERSION_ARGS = {
+    "jpg": [
+        "--ch", "R,G,B",
+        "-d", "uint8",
+        "--compression", "jpeg:100",
+    ],
+    "tga": [
+        "-d", "uint8",
+    ],
+}
+
+
+def can_convert(extension):
+    """Returns True if format could be converted from master image.
+
+    EXR is always saved by Photoshop, conversion to 32 bit is done by
+    Photoshop color management.
+    """
+    return extension in OIIO_CONVERSION_ARGS
+
+
+def has_alpha(path, logger=None):
+    """Returns True if image has alpha channel.
+
+    Photoshop saves PNG without alpha when Background layer is visible.
+    """
+    info = get_oiio_info_for_input(path, logger=logger)
+    return "A" in info["channelnames"]
+
+
+def get_placement_args(trim):
+    """Returns 'oiiotool' arguments placing trimmed image to its canvas.
+
+    Args:
+        trim (dict): offset and canvas size of trimmed image, see
+            'stub.save_trimmed'
+    """
+    if not trim:
+        return []
+    return [
+        "--origin", "+{}+{}".format(trim["x"], trim["y"]),
+        "--fullsize", "{}x{}+0+0".format(
+            trim["canvasWidth"], trim["canvasHeight"]
+        ),
+        "--croptofull",
+    ]
+
+
+def get_conversion_args(
+    src_path, dst_path, extension, trim=None, resize=None, logger=None
+):
+    """Returns 'oiiotool' arguments to convert master image to 'extension'.
+
+    Args:
+        src_path (str): path to master image
+        dst_path (str): output path
+        extension (str): output format
+        trim (dict): if master is trimmed, output is placed back to
+            canvas (see 'stub.save_trimmed')
+        resize (tuple[int, int]): output resolution, keeps resolution of
+            master if not set
+        logger (logging.Logger): logger for reading of master info
+
+    Returns:
+        list[str]
+    """
+    return get_composite_args(
+        [(src_path, trim)], dst_path, extension, resize, logger
+    )
+
+
+def get_review_resolution(width, height, max_dimension):
+    """Returns resolution of image downscaled to fit 'max_dimension'.
+
+    Args:
+        width (int): width of image
+        height (int): height of image
+        max_dimension (int): max width and height, 0 keeps resolution
+
+    Returns:
+        tuple[int, int] or None: None if image doesn't need downscale
+    """
+    if not max_dimension or max(width, height) <= max_dimension:
+        return None
+    scale = max_dimension / max(width, height)
+    return (
+        max(1, int(round(width * scale))),
+        max(1, int(round(height * scale)))
+    )
+
+
+def get_composite_args(
+    sources, dst_path, extension, resize=None, logger=None
+):
+    """Returns 'oiiotool' arguments compositing images 'over' each other.
+
+    Images without alpha get opaque alpha when composited, as 'over'
+    requires alpha in both images. Single image without alpha is not
+    flattened on matte.
+
+    Args:
+        sources (list[tuple[str, dict]]): (path, trim) of images, from top
+            to bottom
+        dst_path (str): output path
+        extension (str): output format
+        resize (tuple[int, int]): output resolution
+        logger (logging.Logger): logger for reading of images info
+
+    Returns:
+        list[str]
+    """
+    args = []
+    alpha = False
+    for src_path, trim in sources:
+        args.append(src_path)
+        if has_alpha(src_path, logger):
+            alpha = True
+        elif len(sources) > 1:
+            args.extend(["--ch", "R,G,B,A=1.0"])
+            alpha = True
+        args.extend(get_placement_args(trim))
+    # each 'over' composites image on top of the one below it
+    args.extend(["--over"] * (len(sources) - 1))
+    if resize:
+        args.extend(["--resize", "{}x{}".format(*resize)])
+    if alpha:
+        args.extend(OIIO_MATTE_ARGS.get(extension, []))
+    return get_oiio_tool_args(
+        "oiiotool",
+        *args,
+        *OIIO_CONVERSION_ARGS[extension],
+        "-o", dst_path
+    )
+
+
+def convert_image(
+    src_path, dst_path, extension, logger=None, trim=None, resize=None
+):
+    """Converts master image to 'extension' format.
+
+    Args:
+        src_path (str): path to master image
+        dst_path (str): output path
+        extension (str): output format, see 'can_convert'
+        logger (logging.Logger): logger for subprocess output
+        trim (dict): offset and canvas size of trimmed master
+        resize (tuple[int, int]): output resolution
+    """
+    args = get_conversion_args(
+        src_path, dst_path, extension, trim, resize, logger
+    )
+    run_subprocess(args, logger=logger)
+
+
+def composite_images(
+    sources, dst_path, extension, logger=None, resize=None
+):
+    """Composites images over each other to 'extension' format.
+
+    Args:
+        sources (list[tuple[str, dict]]): (path, trim) of images, from top
+            to bottom
+        dst_path (str): output path
+        extension (str): output format, see 'can_convert'
+        logger (logging.Logger): logger for subprocess output
+        resize (tuple[int, int]): output resolution
+    """
+    args = get_composite_args(sources, dst_path, extension, resize, logger)
+    run_subprocess(args, logger=logger)
+
+
+class EncoderPool:
+    """Converts images in background while Photoshop renders next ones.
+
+    Each conversion runs in separate 'oiiotool' process, pool threads only
+    wait for them, so conversions use all cores. Number of pending
+    conversions is bounded, 'convert' blocks when queue is full.
+
+    Files to remove ('remove_after') are removed only after all conversions
+    finished, also when context exits with error. Exiting context waits for
+    all conversions and raises first error.
+
+        with EncoderPool(logger=self.log) as pool:
+            for instance in instances:
+                # render master in Photoshop
+                pool.convert(master_path, jpg_path, "jpg")
+
+    Args:
+        max_workers (int): number of parallel conversions, count of CPU
+            cores if not set
+        max_pending (int): number of queued conversions, twice
+            'max_workers' if not set
+        logger (logging.Logger): logger for subprocess output
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, logger=None):
+        if not max_workers:
+            max_workers = os.cpu_count() or 1
+        if not max_pending:
+            max_pending = max_workers * 2
+        self._logger = logger
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="EncoderPool"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+        self._to_remove = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            try:
+                for future in self._futures:
+                    future.cancel()
+                self._executor.shutdown(wait=True)
+            finally:
+                self._futures = []
+                self._remove_files()
+            return
+        self.wait()
+
+    def convert(
+        self, src_path, dst_path, extension, trim=None, resize=None
+    ):
+        """Queues conversion of 'src_path', see 'convert_image'."""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(
+                convert_image, src_path, dst_path, extension, self._logger,
+                trim, resize
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return future
+
+    def remove_after(self, path):
+        """Remove 'path' when all conversions finished."""
+        self._to_remove.append(path)
+
+    def wait(self):
+        """Waits for all conversions, raises first error."""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._futures = []
+            self._remove_files()
+
+    def _remove_files(self):
+        for path in self._to_remove:
+            if os.path.exists(path):
+                os.remove(path)
+        self._to_remove = []
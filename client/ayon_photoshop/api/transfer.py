@@ -0,0 +1,234 @@
+"""Transfers of extracted and published files.
+
+Files are hard linked when source and destination are on same filesystem,
+reflinked (copy-on-write clone) where filesystem supports it and copied
+otherwise. 'TransferQueue' runs transfers concurrently and logs throughput
+of each copied file, so slow network mounts are visible in publish logs.
+
+Used for published files reused by extractors (see
+'CollectContentFingerprint') and for outputs of extractors recorded by
+'record_outputs', which are linked to their publish paths before
+integration (see 'TransferToPublish' plugin).
+"""
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ayon_core.lib import create_hard_link
+
+MODE_HARDLINK = "hardlink"
+MODE_REFLINK = "reflink"
+MODE_COPY = "copy"
+
+# 'FICLONE' ioctl request, clones whole file on Btrfs, XFS etc.
+_FICLONE = 0x40049409
+
+# instance data key with names of representations recorded by extractors
+OUTPUTS_KEY = "transferOutputs"
+
+
+def record_outputs(instance, representations):
+    """Records representations of extractor to be transferred to publish.
+
+    Args:
+        instance (pyblish.api.Instance): instance of representations
+        representations (list[dict]): single file representations
+    """
+    names = instance.data.setdefault(OUTPUTS_KEY, [])
+    for repre in representations:
+        if repre["name"] not in names:
+            names.append(repre["name"])
+
+
+def _reflink(src_path, dst_path):
+    """Clones 'src_path' to 'dst_path' without copying data.
+
+    Raises:
+        OSError: when reflink is not supported
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOTSUP, "Reflink is not supported")
+
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dst_path)
+            raise
+    shutil.copystat(src_path, dst_path)
+
+
+def is_same_device(src_path, dst_path):
+    """Returns True if 'dst_path' would be on filesystem of 'src_path'."""
+    dst_dir = os.path.dirname(os.path.abspath(dst_path))
+    # destination directory might not exist yet
+    while not os.path.exists(dst_dir):
+        parent_dir = os.path.dirname(dst_dir)
+        if parent_dir == dst_dir:
+            return False
+        dst_dir = parent_dir
+    try:
+        return os.stat(src_path).st_dev == os.stat(dst_dir).st_dev
+    except OSError:
+        return False
+
+
+def transfer_file(
+    src_path, dst_path, hardlink=True, reflink=True, copy=True
+):
+    """Transfers 'src_path' to 'dst_path' with fastest available method.
+
+    Existing destination is replaced, missing destination directory is
+    created.
+
+    Args:
+        src_path (str): source file
+        dst_path (str): destination file
+        hardlink (bool): allow hard link, destination shares content and
+            permissions with source
+        reflink (bool): allow copy-on-write clone
+        copy (bool): copy file if it cannot be linked
+
+    Raises:
+        OSError: when file cannot be linked and 'copy' is disabled
+
+    Returns:
+        str: used method, one of 'MODE_HARDLINK', 'MODE_REFLINK',
+            'MODE_COPY'
+    """
+    if os.path.exists(dst_path):
+        os.remove(dst_path)
+    os.makedirs(os.path.dirname(os.path.abspath(dst_path)), exist_ok=True)
+
+    if is_same_device(src_path, dst_path):
+        if hardlink:
+            try:
+                create_hard_link(src_path, dst_path)
+                return MODE_HARDLINK
+            except OSError:
+                pass
+        if reflink:
+            try:
+                _reflink(src_path, dst_path)
+                return MODE_REFLINK
+            except OSError:
+                pass
+
+    if not copy:
+        raise OSError(
+            errno.EXDEV, f"Unable to link {src_path} to {dst_path}"
+        )
+    shutil.copy2(src_path, dst_path)
+    return MODE_COPY
+
+
+class TransferQueue:
+    """Transfers files concurrently, see 'transfer_file'.
+
+    Exiting context waits for all transfers, logs summary and raises first
+    error.
+
+        with TransferQueue(logger=self.log) as queue:
+            for src_path, dst_path in files:
+                queue.add(src_path, dst_path)
+
+    Args:
+        max_workers (int): number of parallel transfers, 4 if not set,
+            transfers are bound by IO, not CPU
+        hardlink (bool): allow hard links
+        reflink (bool): allow copy-on-write clones
+        copy (bool): copy files which cannot be linked, transfer fails
+            otherwise
+        logger (logging.Logger): logger for throughput of transfers
+    """
+
+    def __init__(
+        self, max_workers=None, hardlink=True, reflink=True, copy=True,
+        logger=None
+    ):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or 4, thread_name_prefix="TransferQueue"
+        )
+        self._hardlink = hardlink
+        self._reflink = reflink
+        self._copy = copy
+        self._logger = logger
+        self._futures = []
+        self._lock = threading.Lock()
+        self._transferred_size = 0
+        self._started = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            return
+        self.wait()
+
+    def add(self, src_path, dst_path):
+        """Queues transfer of 'src_path' to 'dst_path'."""
+        if self._started is None:
+            self._started = time.perf_counter()
+        future = self._executor.submit(self._transfer, src_path, dst_path)
+        self._futures.append(future)
+        return future
+
+    def _transfer(self, src_path, dst_path):
+        size = os.path.getsize(src_path)
+        start = time.perf_counter()
+        mode = transfer_file(
+            src_path, dst_path,
+            hardlink=self._hardlink,
+            reflink=self._reflink,
+            copy=self._copy
+        )
+        duration = time.perf_counter() - start
+        with self._lock:
+            self._transferred_size += size
+        if self._logger is not None:
+            message = (
+                f"Transferred ({mode}) {src_path} -> {dst_path}:"
+                f" {_format_size(size)} in {duration:.2f}s"
+            )
+            if mode != MODE_COPY:
+                self._logger.debug(message)
+            else:
+                # only real copies are bound by speed of storage
+                if duration > 0:
+                    message += f" ({_format_size(size / duration)}/s)"
+                self._logger.info(message)
+        return mode
+
+    def wait(self):
+        """Waits for all transfers, raises first error."""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+            if self._futures and self._logger is not None:
+                duration = time.perf_counter() - self._started
+                self._logger.info(
+                    f"Transferred {len(self._futures)} files,"
+                    f" {_format_size(self._transferred_size)}"
+                    f" in {duration:.2f}s"
+                )
+            self._futures = []
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
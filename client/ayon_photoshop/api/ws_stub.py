@@ -2,27 +2,44 @@
     Stub handling connection from server to client.
     Used anywhere solution is calling client methods.
 """
+import asyncio
 from contextlib import contextmanager
-import json
+import logging
+import os
 from pathlib import Path
 import attr
 from wsrpc_aiohttp import WebSocketAsync
 
 from .webserver import WebServerTool
+from .layer_tree import LayerTree
+from .metadata_store import (
+    MetadataStore,
+    METADATA_SOURCE_HEADLINE,
+    METADATA_SOURCE_XMP,
+    decode_item,
+    get_item_key,
+)
+from . import json_codec
 
+log = logging.getLogger(__name__)
 
-@attr.s
+
+@attr.s(slots=True)
 class PSItem(object):
     """
         Object denoting layer or group item in PS. Each item is created in
         PS by any Loader, but contains same fields, which are being used
         in later processing.
+
+        Only id of immediate parent group is stored, 'parents' are derived
+        from chain of parents in 'registry' on first access.
     """
     # metadata
     id = attr.ib()  # id created by AE, could be used for querying
     name = attr.ib()  # name of item
     group = attr.ib(default=None)  # item type (footage, folder, comp)
-    parents = attr.ib(factory=list)
+    # explicit list of parent ids, filled lazily if not provided
+    _parents = attr.ib(default=None, eq=False, order=False)
     visible = attr.ib(default=True)
     type = attr.ib(default=None)
     # all imported elements, single for
@@ -31,6 +48,32 @@ class PSItem(object):
     color_code = attr.ib(default=None)  # color code of layer
     blend_mode = attr.ib(default=None)
     instance_id = attr.ib(default=None)
+    parent_id = attr.ib(default=None)  # id of immediate parent group
+    # {id: PSItem} of all layers in document, used to resolve 'parents'
+    _registry = attr.ib(default=None, eq=False, order=False, repr=False)
+
+    @property
+    def parents(self):
+        """Ids of all parent groups, from top level down.
+
+        Returns:
+            (list)
+        """
+        if self._parents is None:
+            parents = []
+            if self.parent_id is not None:
+                parent = None
+                if self._registry is not None:
+                    parent = self._registry.get(self.parent_id)
+                if parent is not None:
+                    parents.extend(parent.parents)
+                parents.append(self.parent_id)
+            self._parents = parents
+        return self._parents
+
+    @parents.setter
+    def parents(self, value):
+        self._parents = value
 
     @property
     def clean_name(self):
@@ -53,9 +96,54 @@ class PhotoshopServerStub:
     PUBLISH_ICON = '\u2117 '
     LOADED_ICON = '\u25bc'
 
+    # routes which don't change layers, any other route invalidates
+    #   snapshot of layers cached by 'get_layers'
+    LAYERS_READ_ONLY_ROUTES = frozenset({
+        'Photoshop.get_layers',
+        'Photoshop.get_change_token',
+        'Photoshop.get_layers_delta',
+        'Photoshop.get_selected_layers',
+        'Photoshop.get_layer_blend_mode',
+        'Photoshop.get_color_profile_name',
+        'Photoshop.get_document_settings',
+        'Photoshop.get_active_document_name',
+        'Photoshop.get_active_document_full_name',
+        'Photoshop.get_extension_version',
+        'Photoshop.is_saved',
+        'Photoshop.read',
+        'Photoshop.read_metadata',
+        'Photoshop.imprint',
+        'Photoshop.write_metadata',
+        'Photoshop.save',
+        'Photoshop.saveAs',
+        'Photoshop.export_layerset',
+        'Photoshop.export_tiles',
+        'Photoshop.save_trimmed',
+    })
+
+    # snapshot of layers per document shared by all stub instances
+    #   {document_id: (change_token, <list of PSItem>)}
+    _layers_cache = {}
+    # document of last stored snapshot, its token is used to ask for delta
+    _layers_cache_document_id = None
+    # layers were modified through stub, Photoshop must compare layers even
+    #   if change token is the same
+    _layers_cache_stale = False
+    # LayerTree built from cached layers of document
+    #   {document_id: (<list of PSItem>, LayerTree)}
+    _layer_trees_cache = {}
+    # MetadataStore collecting metadata changes in 'metadata_transaction'
+    _metadata_store = None
+    # batched functions not modifying layers
+    METADATA_FUNCTIONS = frozenset({"imprint", "writeMetadata"})
+
     def __init__(self):
         self.websocketserver = WebServerTool.get_instance()
         self.client = self.get_client()
+        # list of queued calls while in 'batch' context, None otherwise
+        self._batch_calls = None
+        # name of history state while in 'transaction' context
+        self._transaction_name = None
 
     @staticmethod
     def get_client():
@@ -72,6 +160,238 @@ class PhotoshopServerStub:
 
         return client
 
+    @contextmanager
+    def batch(self):
+        """Queue calls without return value and send them in one round trip.
+
+        Calls to methods that do not return anything ('rename_layer',
+        'set_visible', 'set_layers_visibility', 'delete_layer',
+        'select_layers', 'imprint' etc.) are queued while in context and
+        evaluated on Photoshop side in single 'evalScript' when context
+        ends. Any other call (eg. 'get_layers') sends queued calls first to
+        keep order of operations.
+
+        Queued calls are bound to this stub instance, use same stub for all
+        calls inside of context:
+
+            with stub.batch():
+                for layer in layers:
+                    stub.rename_layer(layer.id, layer.clean_name)
+
+        Nested contexts are merged into outermost one.
+        """
+        if self._batch_calls is not None:
+            yield self
+            return
+
+        self._batch_calls = []
+        try:
+            yield self
+        finally:
+            try:
+                self._flush_batch()
+            finally:
+                self._batch_calls = None
+
+    @contextmanager
+    def transaction(self, name):
+        """Group changes into single Photoshop history state.
+
+        Works as 'batch', queued calls are evaluated in Photoshop inside of
+        'suspendHistory' so they create one history state named 'name'
+        instead of one per change. That is faster and keeps undo after
+        publishing quick:
+
+            with stub.transaction("Extract images"):
+                for layer in layers:
+                    stub.set_visible(layer.id, False)
+
+        Call with return value (eg. 'get_layers', 'saveAs') sends queued
+        calls first, changes before and after it are in separate history
+        states. Nested transactions and batches are merged into outermost
+        one, name of outermost transaction is used.
+
+        Args:
+            name (str): label of history state
+        """
+        if self._transaction_name is not None:
+            with self.batch():
+                yield self
+            return
+
+        self._transaction_name = name
+        try:
+            with self.batch():
+                yield self
+        finally:
+            self._transaction_name = None
+
+    @contextmanager
+    def metadata_transaction(self):
+        """Collect metadata changes and write Headline only once.
+
+        Headline is read when context starts, 'imprint', 'remove_instance',
+        'read' and 'get_layers_metadata' work with in memory
+        'MetadataStore' and result is written back when context ends. Store
+        is shared by all stub instances, so it could wrap code which calls
+        'stub()' repeatedly:
+
+            with stub.metadata_transaction():
+                for instance in instances:
+                    stub.imprint(instance["instance_id"], instance)
+
+        Nested contexts are merged into outermost one.
+        """
+        cls = PhotoshopServerStub
+        if cls._metadata_store is not None:
+            yield self
+            return
+
+        cls._metadata_store = self._read_metadata()
+        try:
+            yield self
+        finally:
+            store = cls._metadata_store
+            cls._metadata_store = None
+            if store.is_dirty:
+                self._write_metadata(store)
+
+    def _write_metadata(self, store, all_layers=None):
+        """Write content of 'store' to document.
+
+        Items of layers which don't exist anymore are skipped. Storage is
+        selected by 'get_metadata_storage', documents are migrated from
+        the other storage when written.
+        """
+        # Ensure only valid ids are stored.
+        if not all_layers:
+            all_layers = self.get_layers(fields=[])
+        layer_ids = [layer.id for layer in all_layers]
+
+        if self.get_metadata_storage() == METADATA_SOURCE_XMP:
+            order, changed = store.serialize_shards(layer_ids)
+            data = {"items": changed, "order": order, "headline": None}
+            if store.source != METADATA_SOURCE_XMP:
+                # migrated from Headline, keep only one source of truth
+                data["headline"] = ""
+            self._send_metadata("writeMetadata", json_codec.dumps(data))
+            return
+
+        payload = store.serialize(layer_ids)
+        if store.source == METADATA_SOURCE_HEADLINE:
+            self._send_metadata("imprint", payload)
+            return
+        # document might contain items in XMP which would shadow Headline
+        self._send_metadata("writeMetadata", json_codec.dumps(
+            {"items": {}, "order": None, "headline": payload}
+        ))
+
+    def _send_metadata(self, func_name, payload):
+        if self._queue_call(func_name, payload):
+            return
+        route = {
+            "imprint": "Photoshop.imprint",
+            "writeMetadata": "Photoshop.write_metadata",
+        }[func_name]
+        self._call(route, payload=payload)
+
+    @staticmethod
+    def get_metadata_storage():
+        """Returns storage used to write metadata to documents.
+
+        Set by 'AYON_PHOTOSHOP_METADATA_STORAGE' environment variable,
+        'headline' (default) or 'xmp'. Both are always read.
+
+        Returns:
+            str
+        """
+        storage = os.getenv(
+            "AYON_PHOTOSHOP_METADATA_STORAGE", METADATA_SOURCE_HEADLINE
+        ).lower()
+        if storage != METADATA_SOURCE_XMP:
+            storage = METADATA_SOURCE_HEADLINE
+        return storage
+
+    def _read_metadata(self, keys=None):
+        """Reads metadata items of active document into MetadataStore.
+
+        Args:
+            keys (list[str]): keys of items in XMP storage to read, all if
+                None, ignored for Headline storage
+
+        Returns:
+            MetadataStore
+        """
+        kwargs = {}
+        if keys is not None:
+            kwargs["keys"] = json_codec.dumps(list(keys))
+        res = self._call('Photoshop.read_metadata', **kwargs)
+        return self._parse_metadata_response(res)
+
+    @classmethod
+    def _parse_metadata_response(cls, res):
+        """Converts 'readMetadata' result into MetadataStore."""
+        try:
+            data = json_codec.loads(res) if res else {}
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+
+        if data.get("source") != METADATA_SOURCE_XMP:
+            items = cls._parse_layers_metadata(data.get("headline"))
+            return MetadataStore(items, METADATA_SOURCE_HEADLINE)
+
+        shards = data["items"]
+        items = [
+            decode_item(shards[key])
+            for key in data["order"]
+            if key in shards
+        ]
+        return MetadataStore(items, METADATA_SOURCE_XMP, shards)
+
+    def _call(self, route, **kwargs):
+        """Call 'route' on client and wait for result.
+
+        Calls queued by 'batch' are sent first.
+        """
+        self._flush_batch()
+        if route not in self.LAYERS_READ_ONLY_ROUTES:
+            self.invalidate_layers_cache()
+        return self.websocketserver.call(self.client.call(route, **kwargs))
+
+    def _queue_call(self, func_name, *args):
+        """Queue call of 'func_name' (ExtendScript) if in 'batch' context.
+
+        Returns:
+            bool: True if call was queued and shouldn't be sent directly.
+        """
+        if self._batch_calls is None:
+            return False
+        if func_name not in self.METADATA_FUNCTIONS:
+            self.invalidate_layers_cache()
+        self._batch_calls.append({"func": func_name, "args": list(args)})
+        return True
+
+    def _flush_batch(self):
+        """Send calls queued by 'batch' as single 'Photoshop.batch' call."""
+        if not self._batch_calls:
+            return
+        payload = json_codec.dumps(self._batch_calls)
+        self._batch_calls = []
+        res = self.websocketserver.call(
+            self.client.call(
+                'Photoshop.batch',
+                payload=payload,
+                history_name=self._transaction_name or ""
+            )
+        )
+        try:
+            errors = json_codec.loads(res) if res else []
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+        # same as for direct calls failures on Photoshop side are not fatal
+        for error in errors:
+            log.warning("Batch call failed: {}".format(error))
+
     def open(self, path):
         """Open file located at 'path' (local).
 
@@ -79,9 +399,7 @@ class PhotoshopServerStub:
             path(string): file path locally
         Returns: None
         """
-        self.websocketserver.call(
-            self.client.call('Photoshop.open', path=path)
-        )
+        self._call('Photoshop.open', path=path)
 
     def read(self, layer, layers_meta=None):
         """Parses layer metadata from Headline field of active document.
@@ -103,16 +421,38 @@ class PhotoshopServerStub:
                 'schema': 'openpype:container-2.0'
             }
         """
+        store = self._metadata_store
+        if layers_meta is None and store is not None:
+            layer_meta = store.get(layer.id)
+            if layer_meta is not None:
+                return layer_meta
+
         if layers_meta is None:
-            layers_meta = self.get_layers_metadata()
+            # only item of the layer is read from XMP storage
+            key = get_item_key({"members": [layer.id]})
+            keyed_store = self._read_metadata([key])
+            layers_meta = keyed_store.items()
+            if keyed_store.source == METADATA_SOURCE_XMP:
+                layer_meta = self._find_layer_meta(layer, layers_meta)
+                if layer_meta is not None:
+                    return layer_meta
+                # legacy items keyed by 'uuid' or de-duplicated keys
+                layers_meta = self.get_layers_metadata()
+
+        layer_meta = self._find_layer_meta(layer, layers_meta)
+        if layer_meta is not None:
+            return layer_meta
+        print("Unable to find layer metadata for {}".format(layer.id))
 
+    @staticmethod
+    def _find_layer_meta(layer, layers_meta):
         for layer_meta in layers_meta:
             layer_id = layer_meta.get("uuid")  # legacy
             if layer_meta.get("members"):
                 layer_id = layer_meta["members"][0]
             if str(layer.id) == str(layer_id):
                 return layer_meta
-        print("Unable to find layer metadata for {}".format(layer.id))
+        return None
 
     def imprint(self, item_id, data, all_layers=None, items_meta=None):
         """Save layer metadata to Headline field of active document
@@ -148,50 +488,38 @@ class PhotoshopServerStub:
             items_meta(string): json representation from Headline
                            (for performance - provide only if imprint is in
                            loop - value should be same)
-        Returns: None
-        """
-        if not items_meta:
-            items_meta = self.get_layers_metadata()
-
-        # json.dumps writes integer values in a dictionary to string, so
-        # anticipating it here.
-        item_id = str(item_id)
-        is_new = True
-        result_meta = []
-        for item_meta in items_meta:
-            if ((item_meta.get('members') and
-                 item_id == str(item_meta.get('members')[0])) or
-                    item_meta.get("instance_id") == item_id):
-                is_new = False
-                if data:
-                    item_meta.update(data)
-                    result_meta.append(item_meta)
-            else:
-                result_meta.append(item_meta)
-
-        if is_new:
-            result_meta.append(data)
-
-        # Ensure only valid ids are stored.
-        if not all_layers:
-            all_layers = self.get_layers()
-        layer_ids = [layer.id for layer in all_layers]
-        cleaned_data = []
 
-        for item in result_meta:
-            if item.get("members"):
-                if int(item["members"][0]) not in layer_ids:
-                    continue
+        Inside of 'metadata_transaction' change is only stored in memory
+        and written when transaction ends.
 
-            cleaned_data.append(item)
+        Returns: None
+        """
+        if self._metadata_store is not None and not items_meta:
+            self._metadata_store.update(item_id, data)
+            return
+
+        if items_meta:
+            store = MetadataStore(items_meta)
+        else:
+            store = self._read_metadata()
+        store.update(item_id, data)
+        self._write_metadata(store, all_layers)
+
+    def get_layers(self, fields=None):
+        """Returns JSON document with all(?) layers in active document.
 
-        payload = json.dumps(cleaned_data, indent=4)
-        self.websocketserver.call(
-            self.client.call('Photoshop.imprint', payload=payload)
-        )
+        Layers are cached per document. Only changes since last snapshot are
+        transferred from Photoshop (see 'get_layers_delta') and nothing at
+        all if document change token is the same and no method modifying
+        layers was called. Returned items are shared with cache, do not
+        modify them.
 
-    def get_layers(self):
-        """Returns JSON document with all(?) layers in active document.
+        Args:
+            fields (list[str]): limit layer fields read in Photoshop to
+                these ('name', 'color_code', 'type', 'visible',
+                'blend_mode'), 'id', 'group' and 'parents' are always filled,
+                other fields are None. Used only if there are no cached
+                layers yet, cached layers contain all fields.
 
         Returns: <list of PSItem>
                     Format of tuple: { 'id':'123',
@@ -199,11 +527,178 @@ class PhotoshopServerStub:
                                      'type': 'GUIDE'|'FG'|'BG'|'OBJ'
                                      'visible': 'true'|'false'
         """
-        res = self.websocketserver.call(
-            self.client.call('Photoshop.get_layers')
+        cached = self._layers_cache.get(self._layers_cache_document_id)
+        if fields is not None and not cached:
+            res = self._call(
+                'Photoshop.get_layers', fields=json_codec.dumps(list(fields))
+            )
+            return self._to_records(res)
+
+        _, layers = self._refresh_layers_cache()
+        return list(layers)
+
+    def _refresh_layers_cache(self):
+        """Updates cached layers of active document from Photoshop.
+
+        Returns:
+            tuple[Union[int, None], list[PSItem]]: document id and cached
+                list of layers (do not modify it)
+        """
+        cached = self._layers_cache.get(self._layers_cache_document_id)
+        since_token = cached[0] if cached else None
+        delta = self.get_layers_delta(
+            since_token, force=self._layers_cache_stale
         )
+        if not delta:
+            return None, []
+
+        layers = None
+        if delta.get("unchanged"):
+            layers = cached[1]
+        elif not delta["full"]:
+            layers = self._apply_layers_delta(cached[1], delta)
+
+        if layers is None:
+            if not delta["full"]:
+                # delta doesn't match cached layers, get all of them
+                delta = self.get_layers_delta(None)
+            layers = self._layers_data_to_records(delta["layers"])
+
+        self._store_layers_snapshot(
+            delta["document_id"], delta["token"], layers
+        )
+        return delta["document_id"], layers
 
-        return self._to_records(res)
+    def get_layer_tree(self, layers_meta=None):
+        """Returns layers of active document indexed in LayerTree.
+
+        Tree is reused as long as cached layers didn't change.
+
+        Args:
+            layers_meta (list[dict]): metadata from Headline, if provided
+                tree is also indexed by instance ids
+
+        Returns:
+            LayerTree
+        """
+        document_id, layers = self._refresh_layers_cache()
+        tree_cache = self._layer_trees_cache.get(document_id)
+        if tree_cache and tree_cache[0] is layers:
+            tree = tree_cache[1]
+        else:
+            tree = LayerTree(layers)
+            if document_id is not None:
+                self._layer_trees_cache[document_id] = (layers, tree)
+
+        if layers_meta is not None:
+            tree = tree.with_metadata(layers_meta)
+        return tree
+
+    def get_layers_delta(self, since_token=None, force=False):
+        """Returns changes of layers since snapshot with 'since_token'.
+
+        Photoshop keeps last snapshot of layers for each document. If
+        'since_token' matches it, only added, changed and removed layers are
+        returned, all layers otherwise.
+
+        Args:
+            since_token (str): change token of previous snapshot
+            force (bool): compare layers even if document change token
+                is same as 'since_token'
+
+        Returns:
+            (dict) or None if no document is opened
+            example:
+                {"document_id": 1, "token": "1:12:...", "unchanged": True}
+                {"document_id": 1, "token": "1:12:...", "full": True,
+                 "layers": [{..}]}
+                {"document_id": 1, "token": "1:12:...", "full": False,
+                 "added": [{..}], "changed": [{..}], "removed": [12],
+                 "order": [3, 12, 4]}
+        """
+        res = self._call(
+            'Photoshop.get_layers_delta',
+            since_token=json_codec.dumps(since_token),
+            force=force
+        )
+        if not res:
+            return None
+        try:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+
+    def _apply_layers_delta(self, layers, delta):
+        """Creates new list of layers from cached 'layers' and 'delta'.
+
+        Returns:
+            <list of PSItem> or None if delta doesn't match 'layers'
+        """
+        layers_by_id = {layer.id: layer for layer in layers}
+        for layer_id in delta["removed"]:
+            layers_by_id.pop(layer_id, None)
+        new_ids = set()
+        for layer in self._layers_data_to_records(
+            delta["added"] + delta["changed"], layers_by_id
+        ):
+            new_ids.add(layer.id)
+
+        if len(layers_by_id) != len(delta["order"]):
+            return None
+        try:
+            layers = [layers_by_id[layer_id] for layer_id in delta["order"]]
+        except KeyError:
+            return None
+
+        # reused layers are copied, lists returned earlier keep their items,
+        #   copies resolve parents from new registry as parent groups might
+        #   have been moved
+        for idx, layer in enumerate(layers):
+            if layer.id in new_ids:
+                continue
+            parents = layer._parents
+            if layer.parent_id is not None:
+                parents = None
+            layer = attr.evolve(
+                layer, parents=parents, registry=layers_by_id
+            )
+            layers_by_id[layer.id] = layer
+            layers[idx] = layer
+        return layers
+
+    @classmethod
+    def _store_layers_snapshot(cls, document_id, token, layers):
+        cls._layers_cache[document_id] = (token, layers)
+        cls._layers_cache_document_id = document_id
+        cls._layers_cache_stale = False
+
+    def get_change_token(self):
+        """Returns cheap token which changes with any change of document.
+
+        Token is composed on Photoshop side from history state of active
+        document, it is used to validate cached layers.
+
+        Returns:
+            tuple(int, str): active document id and change token,
+                (None, None) if no document is opened
+        """
+        res = self._call('Photoshop.get_change_token')
+        if not res:
+            return None, None
+        try:
+            data = json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+        return data["document_id"], data["token"]
+
+    @classmethod
+    def invalidate_layers_cache(cls):
+        """Mark layers cached by 'get_layers' as outdated.
+
+        Cached layers are still used as a base for delta of next
+        'get_layers' call.
+        """
+        cls._layers_cache_stale = True
 
     def get_layer(self, layer_id):
         """
@@ -214,10 +709,7 @@ class PhotoshopServerStub:
         Returns:
             (PSItem) or None
         """
-        layers = self.get_layers()
-        for layer in layers:
-            if str(layer.id) == str(layer_id):
-                return layer
+        return self.get_layer_tree().get(layer_id)
 
     def get_layers_in_layers(self, layers):
         """Return all layers that belong to layers (might be groups).
@@ -248,19 +740,13 @@ class PhotoshopServerStub:
 
     def _get_layers_in_layers(self, parent_ids, layers=None):
         if not layers:
-            layers = self.get_layers()
-
-        all_layers = layers
-        ret = []
+            tree = self.get_layer_tree()
+        elif isinstance(layers, LayerTree):
+            tree = layers
+        else:
+            tree = LayerTree(layers)
 
-        for layer in all_layers:
-            parents = set(layer.parents)
-            if len(parent_ids & parents) > 0:
-                ret.append(layer)
-            if layer.id in parent_ids:
-                ret.append(layer)
-
-        return ret
+        return tree.get_layers_in_layers(parent_ids)
 
     def create_group(self, name):
         """Create new group (eg. LayerSet)
@@ -269,9 +755,7 @@ class PhotoshopServerStub:
             <PSItem>
         """
         enhanced_name = self.PUBLISH_ICON + name
-        ret = self.websocketserver.call(
-            self.client.call('Photoshop.create_group', name=enhanced_name)
-        )
+        ret = self._call('Photoshop.create_group', name=enhanced_name)
         # create group on PS is asynchronous, returns only id
         return PSItem(id=ret, name=name, group=True)
 
@@ -282,10 +766,8 @@ class PhotoshopServerStub:
             (Layer)
         """
         enhanced_name = self.PUBLISH_ICON + name
-        res = self.websocketserver.call(
-            self.client.call(
-                'Photoshop.group_selected_layers', name=enhanced_name
-            )
+        res = self._call(
+            'Photoshop.group_selected_layers', name=enhanced_name
         )
         res = self._to_records(res)
         if res:
@@ -299,9 +781,7 @@ class PhotoshopServerStub:
 
         Returns: <list of Layer('id':XX, 'name':"YYY")>
         """
-        res = self.websocketserver.call(
-            self.client.call('Photoshop.get_selected_layers')
-        )
+        res = self._call('Photoshop.get_selected_layers')
         return self._to_records(res)
 
     def select_layers(self, layers):
@@ -311,11 +791,11 @@ class PhotoshopServerStub:
             layers: <list of Layer('id':XX, 'name':"YYY")>
         """
         layers_id = [str(lay.id) for lay in layers]
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.select_layers',
-                layers=json.dumps(layers_id)
-            )
+        if self._queue_call("selectLayers", json_codec.dumps(layers_id)):
+            return
+        self._call(
+            'Photoshop.select_layers',
+            layers=json_codec.dumps(layers_id)
         )
 
     def dissolve_layerset(self, layerset_id: str):
@@ -326,11 +806,11 @@ class PhotoshopServerStub:
         Args:
             layerset_id (str): id of layer set to dissolve
         """
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.dissolve_layerset',
-                layerset_id=layerset_id
-            )
+        if self._queue_call("dissolveLayerSet", layerset_id):
+            return
+        self._call(
+            'Photoshop.dissolve_layerset',
+            layerset_id=layerset_id
         )
 
     def merge_all_layersets(self, parent_set=None):
@@ -340,11 +820,9 @@ class PhotoshopServerStub:
             parent_set (str): id of layer set to merge layers sets it contains.
                 If None, all first level layer sets will be merged.
         """
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.merge_all_layersets',
-                parent_set=parent_set,
-            )
+        self._call(
+            'Photoshop.merge_all_layersets',
+            parent_set=parent_set,
         )
 
     def get_active_document_full_name(self):
@@ -353,9 +831,7 @@ class PhotoshopServerStub:
         Returns(string):
             full path with name
         """
-        res = self.websocketserver.call(
-            self.client.call('Photoshop.get_active_document_full_name')
-        )
+        res = self._call('Photoshop.get_active_document_full_name')
 
         return res
 
@@ -365,9 +841,7 @@ class PhotoshopServerStub:
         Returns(string):
             file name
         """
-        return self.websocketserver.call(
-            self.client.call('Photoshop.get_active_document_name')
-        )
+        return self._call('Photoshop.get_active_document_name')
 
     def is_saved(self):
         """Returns true if no changes in active document
@@ -375,15 +849,11 @@ class PhotoshopServerStub:
         Returns:
             <boolean>
         """
-        return self.websocketserver.call(
-            self.client.call('Photoshop.is_saved')
-        )
+        return self._call('Photoshop.is_saved')
 
     def save(self):
         """Saves active document"""
-        self.websocketserver.call(
-            self.client.call('Photoshop.save')
-        )
+        self._call('Photoshop.save')
 
     def saveAs(self, image_path, ext, as_copy):
         """Saves active document to psd (copy) or png or jpg
@@ -394,14 +864,116 @@ class PhotoshopServerStub:
             as_copy: <boolean>
         Returns: None
         """
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.saveAs',
-                image_path=image_path,
-                ext=ext,
-                as_copy=as_copy
-            )
+        self._call(
+            'Photoshop.saveAs',
+            image_path=image_path,
+            ext=ext,
+            as_copy=as_copy
+        )
+
+    def export_layer_comps(self, exports):
+        """Exports multiple visibility states of document in single call.
+
+        Each export is captured to temporary layer comp first, then all
+        comps are applied and saved one by one. Original visibility is
+        restored and temporary comps removed afterwards.
+
+        Args:
+            exports (list[dict]): items with keys
+                'name' (str): unique name of export
+                'visibility' (dict): {layer_id: visible} applied on
+                    current state of document
+                'outputs' (list[dict]): {'path': str, 'ext': str} files to
+                    save (see 'saveAs')
+                'trim' (bool): optional, crop outputs to content (see
+                    'save_trimmed')
+
+        Returns:
+            dict: {name: {'files': [saved paths], 'error': str or None,
+                'trim': bounds of trimmed outputs}}
+        """
+        res = self._call(
+            'Photoshop.export_layer_comps',
+            payload=json_codec.dumps(exports)
+        )
+        try:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+
+    def save_trimmed(self, outputs):
+        """Saves visible content of active document cropped to its bounds.
+
+        Merged copy of visible content is cropped and saved, document
+        itself is not modified. Document without visible content is saved
+        whole.
+
+        Args:
+            outputs (list[dict]): {'path': str, 'ext': str} files to save
+                (see 'saveAs')
+
+        Returns:
+            dict: {'x': int, 'y': int, 'width': int, 'height': int,
+                'canvasWidth': int, 'canvasHeight': int} offset and size of
+                saved images in canvas of document
+        """
+        res = self._call(
+            'Photoshop.save_trimmed',
+            payload=json_codec.dumps(outputs)
+        )
+        try:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+
+    def export_tiles(self, output_dir, tile_size):
+        """Exports visible content of active document in tiles.
+
+        Used for huge documents which cannot be saved at once, tiles are
+        stitched by 'tiled_export.stitch_tiles'.
+
+        Args:
+            output_dir (str): directory for tiles (uncompressed 8 bit TGA)
+            tile_size (int): width and height of tile in pixels
+
+        Returns:
+            dict: {'width': int, 'height': int, 'tiles': [{'path': str,
+                'x': int, 'y': int, 'width': int, 'height': int}]}
+        """
+        res = self._call(
+            'Photoshop.export_tiles',
+            payload=json_codec.dumps({
+                "output_dir": output_dir.replace("\\", "/"),
+                "tile_size": tile_size,
+            })
+        )
+        try:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+
+    def get_content_fingerprints(self, items):
+        """Returns data describing content of layers and composites.
+
+        Args:
+            items (list[dict]): items with keys
+                'name' (str): unique name of item
+                'visibility' (dict): {layer_id: visible} applied before
+                    histogram of composite is read
+                'restore' (dict): {layer_id: visible} applied after
+
+        Returns:
+            dict: {'layers': {layer_id (str): signature},
+                'histograms': {name: histogram}}
+        """
+        res = self._call(
+            'Photoshop.get_content_fingerprints',
+            payload=json_codec.dumps(items)
         )
+        try:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
 
     @contextmanager
     def duplicate_document(self, path: str):
@@ -418,11 +990,9 @@ class PhotoshopServerStub:
         """
         try:
             path = Path(path)
-            document_id = self.websocketserver.call(
-                self.client.call(
-                    'Photoshop.duplicate_document',
-                    newName=path.name,
-                )
+            document_id = self._call(
+                'Photoshop.duplicate_document',
+                newName=path.name,
             )
             yield
         finally:
@@ -434,20 +1004,35 @@ class PhotoshopServerStub:
             )
             self.close_document(document_id)
 
+    def export_layerset(self, layerset_id, path, merge_layersets=False):
+        """Save layer set into new document containing only its layers.
+
+        Only the layer set is duplicated into new document, active document
+        is not copied nor modified. Layer set itself is dissolved in saved
+        file.
+
+        Args:
+            layerset_id (int): id of layer set (group)
+            path (str): file path to save, format by extension (psd|psb)
+            merge_layersets (bool): merge layer sets nested in the set
+        """
+        self._call(
+            'Photoshop.export_layerset',
+            layerset_id=layerset_id,
+            path=str(path),
+            merge_layersets=merge_layersets
+        )
+
     def close_document(self, id: str):
         """Close document with id."""
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.close_document',
-                id=id
-            )
+        self._call(
+            'Photoshop.close_document',
+            id=id
         )
 
     def revert_to_previous(self):
         """Reverts active document to last saved state"""
-        self.websocketserver.call(
-            self.client.call('Photoshop.revert_to_previous')
-        )
+        self._call('Photoshop.revert_to_previous')
 
     def set_visible(self, layer_id, visibility):
         """Set layer with 'layer_id' to 'visibility'
@@ -457,12 +1042,12 @@ class PhotoshopServerStub:
             visibility: <true - set visible, false - hide>
         Returns: None
         """
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.set_visible',
-                layer_id=layer_id,
-                visibility=visibility
-            )
+        if self._queue_call("setVisible", layer_id, visibility):
+            return
+        self._call(
+            'Photoshop.set_visible',
+            layer_id=layer_id,
+            visibility=visibility
         )
 
     def set_layers_visibility(self, visibility_map: dict[int, bool]):
@@ -471,11 +1056,12 @@ class PhotoshopServerStub:
         Args:
             visibility_map (dict[int, bool]): {layer_id: bool, ...}
         """
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.set_layers_visibility',
-                visibility_map=json.dumps(visibility_map)
-            )
+        visibility_map = json_codec.dumps(visibility_map)
+        if self._queue_call("setLayersVisibility", visibility_map):
+            return
+        self._call(
+            'Photoshop.set_layers_visibility',
+            visibility_map=visibility_map
         )
 
     def delete_all_layers(self, exclude_layers=None, exclude_recursive=False):
@@ -489,9 +1075,22 @@ class PhotoshopServerStub:
         if exclude_recursive:
             exclude_ids |= {ll.id for ll in self.get_layers_in_layers(exclude_layers)}
         
-        for layer in self.get_layers():
-            if layer.id not in exclude_ids:
-                self.delete_layer(layer.id)
+        layers = self.get_layers(fields=[])
+        # groups of excluded layers must be kept too
+        for layer in layers:
+            if layer.id in exclude_ids:
+                exclude_ids.update(layer.parents)
+
+        deleted_ids = set()
+        to_delete = []
+        for layer in layers:
+            if layer.id in exclude_ids:
+                continue
+            # children are removed together with their group
+            if not deleted_ids.intersection(layer.parents):
+                to_delete.append(layer.id)
+            deleted_ids.add(layer.id)
+        self.delete_layers(to_delete)
 
     def get_layers_metadata(self):
         """Reads layers metadata from Headline from active document in PS.
@@ -505,21 +1104,9 @@ class PhotoshopServerStub:
                       "folderPath":"/Town"}}
                 8 is layer(group) id - used for deletion, update etc.
         """
-        res = self.websocketserver.call(self.client.call('Photoshop.read'))
-        layers_data = []
-        try:
-            if res:
-                layers_data = json.loads(res)
-        except json.decoder.JSONDecodeError:
-            raise ValueError("{} cannot be parsed, recreate meta".format(res))
-        # format of metadata changed from {} to [] because of standardization
-        # keep current implementation logic as its working
-        if isinstance(layers_data, dict):
-            for layer_id, layer_meta in layers_data.items():
-                if layer_meta.get("schema") != "openpype:container-2.0":
-                    layer_meta["members"] = [str(layer_id)]
-            layers_data = list(layers_data.values())
-        return layers_data
+        if self._metadata_store is not None:
+            return self._metadata_store.items()
+        return self._read_metadata().items()
 
     def import_smart_object(self, path, layer_name, as_reference=False):
         """Import the file at `path` as a smart object to active document.
@@ -531,13 +1118,11 @@ class PhotoshopServerStub:
             as_reference (bool): pull in content or reference
         """
         enhanced_name = self.LOADED_ICON + layer_name
-        res = self.websocketserver.call(
-            self.client.call(
-                'Photoshop.import_smart_object',
-                path=path,
-                name=enhanced_name,
-                as_reference=as_reference
-            )
+        res = self._call(
+            'Photoshop.import_smart_object',
+            path=path,
+            name=enhanced_name,
+            as_reference=as_reference
         )
         rec = self._to_records(res).pop()
         if rec:
@@ -554,13 +1139,11 @@ class PhotoshopServerStub:
                 same smart object was loaded
         """
         enhanced_name = self.LOADED_ICON + layer_name
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.replace_smart_object',
-                layer_id=layer.id,
-                path=path,
-                name=enhanced_name
-            )
+        self._call(
+            'Photoshop.replace_smart_object',
+            layer_id=layer.id,
+            path=path,
+            name=enhanced_name
         )
 
     def delete_layer(self, layer_id):
@@ -569,9 +1152,25 @@ class PhotoshopServerStub:
         Args:
             layer_id (int): id of layer to delete
         """
-        self.websocketserver.call(
-            self.client.call('Photoshop.delete_layer', layer_id=layer_id)
-        )
+        if self._queue_call("deleteLayer", layer_id):
+            return
+        self._call('Photoshop.delete_layer', layer_id=layer_id)
+
+    def delete_layers(self, layer_ids):
+        """Deletes multiple layers in single step.
+
+        All layers are removed by one action in one history state.
+
+        Args:
+            layer_ids (list[int]): ids of layers to delete
+        """
+        layer_ids = list(layer_ids)
+        if not layer_ids:
+            return
+        payload = json_codec.dumps(layer_ids)
+        if self._queue_call("deleteLayers", payload):
+            return
+        self._call('Photoshop.delete_layers', layer_ids=payload)
 
     def rename_layer(self, layer_id, name):
         """Renames specific layer by it's id.
@@ -580,58 +1179,40 @@ class PhotoshopServerStub:
             layer_id (int): id of layer to delete
             name (str): new name
         """
-        self.websocketserver.call(
-            self.client.call(
-                'Photoshop.rename_layer',
-                layer_id=layer_id,
-                name=name
-            )
+        if self._queue_call("renameLayer", layer_id, name):
+            return
+        self._call(
+            'Photoshop.rename_layer',
+            layer_id=layer_id,
+            name=name
         )
 
     def get_color_profile_name(self):
         """Returns active document's color profile name."""
-        colorspace_profile = self.websocketserver.call(
-            self.client.call('Photoshop.get_color_profile_name')
-        )
+        colorspace_profile = self._call('Photoshop.get_color_profile_name')
         return colorspace_profile
 
     def remove_instance(self, instance_id):
-        cleaned_data = []
-
-        for item in self.get_layers_metadata():
-            inst_id = item.get("instance_id") or item.get("uuid")
-            if inst_id != instance_id:
-                cleaned_data.append(item)
+        if self._metadata_store is not None:
+            self._metadata_store.remove_instance(instance_id)
+            return
 
-        payload = json.dumps(cleaned_data, indent=4)
-
-        self.websocketserver.call(
-            self.client.call('Photoshop.imprint', payload=payload)
-        )
+        store = self._read_metadata()
+        store.remove_instance(instance_id)
+        self._write_metadata(store)
 
     def get_extension_version(self):
         """Returns version number of installed extension."""
-        return self.websocketserver.call(
-            self.client.call('Photoshop.get_extension_version')
-        )
+        return self._call('Photoshop.get_extension_version')
 
     def get_layer_blend_mode(self, layer_id):
         """Returns blend mode string for specific layer."""
-        return self.websocketserver.call(
-            self.client.call('Photoshop.get_layer_blend_mode', layer_id=layer_id)
-        )
+        return self._call('Photoshop.get_layer_blend_mode', layer_id=layer_id)
 
     def get_document_settings(self):
         """Returns dict with document resolution, mode and bits per channel."""
-        res = self.websocketserver.call(
-            self.client.call('Photoshop.get_document_settings')
-        )
-        if not res:
-            return {}
-        try:
-            return json.loads(res)
-        except json.decoder.JSONDecodeError:
-            raise ValueError("Received broken JSON {}".format(res))
+        res = self._call('Photoshop.get_document_settings')
+        return self._parse_document_settings(res)
 
     def set_document_settings(self, resolution=None, mode=None, bits=None):
         """Sets document resolution, color mode, and/or bit depth.
@@ -647,19 +1228,17 @@ class PhotoshopServerStub:
         Note:
             Some conversions may be lossy (e.g., CMYK to RGB, 32 to 16 bits).
         """
-        res = self.websocketserver.call(
-            self.client.call(
-                'Photoshop.set_document_settings',
-                resolution=resolution,
-                mode=mode,
-                bits=bits
-            )
+        res = self._call(
+            'Photoshop.set_document_settings',
+            resolution=resolution,
+            mode=mode,
+            bits=bits
         )
         if not res:
             return {"success": False, "error": "No response from Photoshop"}
         try:
-            return json.loads(res)
-        except json.decoder.JSONDecodeError:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
             raise ValueError("Received broken JSON {}".format(res))
 
     def close(self):
@@ -668,7 +1247,7 @@ class PhotoshopServerStub:
             For webpublishing only.
         """
         # TODO change client.call to method with checks for client
-        self.websocketserver.call(self.client.call('Photoshop.close'))
+        self._call('Photoshop.close')
 
     def eval(self, code: str):
         """Execute Javascript code.
@@ -682,14 +1261,48 @@ class PhotoshopServerStub:
         """
         # TODO: Can we provide more info to the user on execution failure
         #  on the javascript side, like raising an informative error?
-        return self.websocketserver.call(
-            self.client.call(
-                'Photoshop.eval_code',
-                code=code,
-            )
+        return self._call(
+            'Photoshop.eval_code',
+            code=code,
         )
 
-    def _to_records(self, res):
+    @staticmethod
+    def _parse_layers_metadata(res):
+        """Converts Headline content into list of metadata items.
+
+        Args:
+            res (string): json stored in Headline, might be empty
+
+        Returns:
+            (list)
+        """
+        layers_data = []
+        try:
+            if res:
+                layers_data = json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("{} cannot be parsed, recreate meta".format(res))
+        # format of metadata changed from {} to [] because of standardization
+        # keep current implementation logic as its working
+        if isinstance(layers_data, dict):
+            for layer_id, layer_meta in layers_data.items():
+                if layer_meta.get("schema") != "openpype:container-2.0":
+                    layer_meta["members"] = [str(layer_id)]
+            layers_data = list(layers_data.values())
+        return layers_data
+
+    @staticmethod
+    def _parse_document_settings(res):
+        """Converts json with document settings into dict."""
+        if not res:
+            return {}
+        try:
+            return json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+
+    @staticmethod
+    def _to_records(res):
         """Converts string json representation into list of PSItem for
         dot notation access to work.
 
@@ -700,27 +1313,269 @@ class PhotoshopServerStub:
             <list of PSItem>
         """
         try:
-            layers_data = json.loads(res)
-        except json.decoder.JSONDecodeError:
+            layers_data = json_codec.loads(res)
+        except json_codec.JSONDecodeError:
             raise ValueError("Received broken JSON {}".format(res))
-        ret = []
 
         # convert to AEItem to use dot donation
         if isinstance(layers_data, dict):
             layers_data = [layers_data]
+        return PhotoshopServerStub._layers_data_to_records(layers_data)
+
+    @staticmethod
+    def _layers_data_to_records(layers_data, registry=None):
+        """Converts list of parsed layer dictionaries into list of PSItem.
+
+        Args:
+            layers_data (list[dict])
+            registry (dict): {id: PSItem} to add created items to, used by
+                items to resolve their 'parents'
+
+        Returns:
+            <list of PSItem>
+        """
+        if registry is None:
+            registry = {}
+        ret = []
         for d in layers_data:
+            parents = d.get('parents')  # older extensions send full list
+            parent_id = d.get("parent")
+            if parent_id is None and parents:
+                parent_id = parents[-1]
             # currently implemented and expected fields
-            ret.append(PSItem(
+            item = PSItem(
                 d.get('id'),
                 d.get('name'),
                 d.get('group'),
-                d.get('parents'),
+                parents,
                 d.get('visible'),
                 d.get('type'),
                 d.get('members'),
                 d.get('long_name'),
                 d.get("color_code"),
                 d.get("blend_mode"),
-                d.get("instance_id")
-            ))
+                d.get("instance_id"),
+                parent_id,
+                registry
+            )
+            registry[item.id] = item
+            ret.append(item)
         return ret
+
+
+class AsyncPhotoshopServerStub:
+    """Asyncio variant of 'PhotoshopServerStub'.
+
+    Methods are coroutines running on loop of webserver thread, so
+    independent calls could be awaited together and their round trips to
+    Photoshop overlap:
+
+        async_stub = AsyncPhotoshopServerStub()
+        layers, layers_meta = async_stub.run(async_stub.gather(
+            async_stub.get_layers(),
+            async_stub.get_layers_metadata(),
+        ))
+
+    Coroutines must be awaited on webserver loop, use 'run' to do it from
+    any other thread (eg. from publish plugins).
+    """
+    PUBLISH_ICON = PhotoshopServerStub.PUBLISH_ICON
+    LOADED_ICON = PhotoshopServerStub.LOADED_ICON
+
+    def __init__(self):
+        self.websocketserver = WebServerTool.get_instance()
+        self.client = PhotoshopServerStub.get_client()
+
+    def run(self, coro):
+        """Run coroutine on webserver loop and wait for its result.
+
+        Args:
+            coro (Coroutine): coroutine created by methods of this stub
+
+        Returns:
+            Any: result of coroutine
+        """
+        return self.websocketserver.call(coro)
+
+    @staticmethod
+    async def gather(*coros):
+        """Await multiple coroutines concurrently.
+
+        Returns:
+            (list) results in same order as 'coros'
+        """
+        return list(await asyncio.gather(*coros))
+
+    async def _call(self, route, **kwargs):
+        return await self.client.call(route, **kwargs)
+
+    async def open(self, path):
+        """Open file located at 'path' (local)."""
+        await self._call('Photoshop.open', path=path)
+
+    async def read(self, layer, layers_meta=None):
+        """Parses layer metadata from Headline field of active document.
+
+        See 'PhotoshopServerStub.read'.
+        """
+        if layers_meta is None:
+            layers_meta = await self.get_layers_metadata()
+
+        for layer_meta in layers_meta:
+            layer_id = layer_meta.get("uuid")  # legacy
+            if layer_meta.get("members"):
+                layer_id = layer_meta["members"][0]
+            if str(layer.id) == str(layer_id):
+                return layer_meta
+
+    async def get_layers(self, fields=None):
+        """Returns list of all layers in active document.
+
+        Args:
+            fields (list[str]): limit layer fields read in Photoshop,
+                see 'PhotoshopServerStub.get_layers'
+
+        Returns:
+            <list of PSItem>
+        """
+        kwargs = {}
+        if fields is not None:
+            kwargs["fields"] = json_codec.dumps(list(fields))
+        res = await self._call('Photoshop.get_layers', **kwargs)
+        return PhotoshopServerStub._to_records(res)
+
+    async def get_layer(self, layer_id):
+        """Returns PSItem for specific 'layer_id' or None if not found."""
+        for layer in await self.get_layers():
+            if str(layer.id) == str(layer_id):
+                return layer
+
+    async def get_selected_layers(self):
+        """Get a list of actually selected layers.
+
+        Returns:
+            <list of PSItem>
+        """
+        res = await self._call('Photoshop.get_selected_layers')
+        return PhotoshopServerStub._to_records(res)
+
+    async def get_change_token(self):
+        """Returns cheap token which changes with any change of document.
+
+        See 'PhotoshopServerStub.get_change_token'.
+        """
+        res = await self._call('Photoshop.get_change_token')
+        if not res:
+            return None, None
+        try:
+            data = json_codec.loads(res)
+        except json_codec.JSONDecodeError:
+            raise ValueError("Received broken JSON {}".format(res))
+        return data["document_id"], data["token"]
+
+    async def get_layers_metadata(self):
+        """Reads layers metadata from Headline from active document in PS.
+
+        Returns:
+            (list)
+        """
+        res = await self._call('Photoshop.read_metadata')
+        store = PhotoshopServerStub._parse_metadata_response(res)
+        return store.items()
+
+    async def get_active_document_full_name(self):
+        """Returns full name with path of active document."""
+        return await self._call('Photoshop.get_active_document_full_name')
+
+    async def get_active_document_name(self):
+        """Returns just a name of active document."""
+        return await self._call('Photoshop.get_active_document_name')
+
+    async def is_saved(self):
+        """Returns true if no changes in active document."""
+        return await self._call('Photoshop.is_saved')
+
+    async def get_color_profile_name(self):
+        """Returns active document's color profile name."""
+        return await self._call('Photoshop.get_color_profile_name')
+
+    async def get_document_settings(self):
+        """Returns dict with document resolution, mode and bits per channel."""
+        res = await self._call('Photoshop.get_document_settings')
+        return PhotoshopServerStub._parse_document_settings(res)
+
+    async def get_layer_blend_mode(self, layer_id):
+        """Returns blend mode string for specific layer."""
+        return await self._call(
+            'Photoshop.get_layer_blend_mode', layer_id=layer_id
+        )
+
+    async def get_extension_version(self):
+        """Returns version number of installed extension."""
+        return await self._call('Photoshop.get_extension_version')
+
+    async def select_layers(self, layers):
+        """Selects specified layers in Photoshop by its ids."""
+        layers_id = [str(lay.id) for lay in layers]
+        await self._call(
+            'Photoshop.select_layers',
+            layers=json_codec.dumps(layers_id)
+        )
+
+    async def set_visible(self, layer_id, visibility):
+        """Set layer with 'layer_id' to 'visibility'."""
+        await self._call(
+            'Photoshop.set_visible',
+            layer_id=layer_id,
+            visibility=visibility
+        )
+
+    async def set_layers_visibility(self, visibility_map):
+        """Set visibility for multiple layers in one call.
+
+        Args:
+            visibility_map (dict[int, bool]): {layer_id: bool, ...}
+        """
+        await self._call(
+            'Photoshop.set_layers_visibility',
+            visibility_map=json_codec.dumps(visibility_map)
+        )
+
+    async def rename_layer(self, layer_id, name):
+        """Renames specific layer by it's id."""
+        await self._call(
+            'Photoshop.rename_layer',
+            layer_id=layer_id,
+            name=name
+        )
+
+    async def delete_layer(self, layer_id):
+        """Deletes specific layer by it's id."""
+        await self._call('Photoshop.delete_layer', layer_id=layer_id)
+
+    async def delete_layers(self, layer_ids):
+        """Deletes multiple layers in single step."""
+        layer_ids = list(layer_ids)
+        if not layer_ids:
+            return
+        await self._call(
+            'Photoshop.delete_layers',
+            layer_ids=json_codec.dumps(layer_ids)
+        )
+
+    async def save(self):
+        """Saves active document"""
+        await self._call('Photoshop.save')
+
+    async def saveAs(self, image_path, ext, as_copy):
+        """Saves active document to psd (copy) or png or jpg."""
+        await self._call(
+            'Photoshop.saveAs',
+            image_path=image_path,
+            ext=ext,
+            as_copy=as_copy
+        )
+
+    async def eval(self, code: str):
+        """Execute Javascript code."""
+        return await self._call('Photoshop.eval_code', code=code)
@@ -72,6 +72,10 @@ class PhotoshopPrelaunchHook(PreLaunchHook):
         self.launch_context.env["AYON_PHOTOSHOP_WORKFILES_ON_LAUNCH"] = (
             str(workfile_startup).lower()
         )
+        photoshop_settings = self.data["project_settings"]["photoshop"]
+        self.launch_context.env["AYON_PHOTOSHOP_METADATA_STORAGE"] = (
+            photoshop_settings.get("metadata_storage", "headline")
+        )
         # Append as whole list as these arguments should not be separated
         self.launch_context.launch_args.append(new_launch_args)
 
@@ -155,17 +155,20 @@ class ImageCreator(Creator):
 
     def update_instances(self, update_list):
         self.log.debug("update_list:: {}".format(update_list))
-        for created_inst, _changes in update_list:
-            if created_inst.get("layer"):
-                # not storing PSItem layer to metadata
-                created_inst.pop("layer")
-            api.stub().imprint(created_inst.get("instance_id"),
-                               created_inst.data_to_store())
+        stub = api.stub()
+        with stub.metadata_transaction():
+            for created_inst, _changes in update_list:
+                if created_inst.get("layer"):
+                    # not storing PSItem layer to metadata
+                    created_inst.pop("layer")
+                stub.imprint(created_inst.get("instance_id"),
+                             created_inst.data_to_store())
 
     def remove_instances(self, instances):
-        for instance in instances:
-            self.host.remove_instance(instance)
-            self._remove_instance_from_context(instance)
+        with api.stub().metadata_transaction():
+            for instance in instances:
+                self.host.remove_instance(instance)
+                self._remove_instance_from_context(instance)
 
     def get_pre_create_attr_defs(self):
         output = [
@@ -18,7 +18,7 @@ class ImageLoader(photoshop.PhotoshopLoader):
     def load(self, context, name=None, namespace=None, data=None):
         stub = self.get_stub()
         layer_name = get_unique_layer_name(
-            stub.get_layers(),
+            stub.get_layers(fields=["name"]),
             context["folder"]["name"],
             name
         )
@@ -53,7 +53,9 @@ class ImageLoader(photoshop.PhotoshopLoader):
         # switching assets
         if namespace_from_container != layer_name:
             layer_name = get_unique_layer_name(
-                stub.get_layers(), folder_name, product_name
+                stub.get_layers(fields=["name"]),
+                folder_name,
+                product_name
             )
         else:  # switching version - keep same name
             layer_name = container["namespace"]
@@ -77,8 +79,10 @@ class ImageLoader(photoshop.PhotoshopLoader):
         stub = self.get_stub()
 
         layer = container.pop("layer")
-        stub.imprint(layer.id, {})
-        stub.delete_layer(layer.id)
+        # metadata and layer removed in single call
+        with stub.batch():
+            stub.imprint(layer.id, {})
+            stub.delete_layers([layer.id])
 
     def switch(self, container, context):
         self.update(container, context)
@@ -41,7 +41,9 @@ class ImageFromSequenceLoader(photoshop.PhotoshopLoader):
 
         stub = self.get_stub()
         layer_name = get_unique_layer_name(
-            stub.get_layers(), context["folder"]["name"], name
+            stub.get_layers(fields=["name"]),
+            context["folder"]["name"],
+            name
         )
 
         with photoshop.maintained_selection():
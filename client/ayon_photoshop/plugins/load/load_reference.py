@@ -21,7 +21,9 @@ class ReferenceLoader(photoshop.PhotoshopLoader):
     def load(self, context, name=None, namespace=None, data=None):
         stub = self.get_stub()
         layer_name = get_unique_layer_name(
-            stub.get_layers(), context["folder"]["name"], name
+            stub.get_layers(fields=["name"]),
+            context["folder"]["name"],
+            name
         )
         with photoshop.maintained_selection():
             path = self.filepath_from_context(context)
@@ -53,7 +55,9 @@ class ReferenceLoader(photoshop.PhotoshopLoader):
         # switching assets
         if namespace_from_container != layer_name:
             layer_name = get_unique_layer_name(
-                stub.get_layers(), folder_name, product_name
+                stub.get_layers(fields=["name"]),
+                folder_name,
+                product_name
             )
         else:  # switching version - keep same name
             layer_name = container["namespace"]
@@ -76,8 +80,10 @@ class ReferenceLoader(photoshop.PhotoshopLoader):
         """
         stub = self.get_stub()
         layer = container.pop("layer")
-        stub.imprint(layer.id, {})
-        stub.delete_layer(layer.id)
+        # metadata and layer removed in single call
+        with stub.batch():
+            stub.imprint(layer.id, {})
+            stub.delete_layers([layer.id])
 
     def switch(self, container, context):
         self.update(container, context)
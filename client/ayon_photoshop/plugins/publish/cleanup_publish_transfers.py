@@ -0,0 +1,41 @@
+import os
+
+import pyblish.api
+
+
+class CleanupPublishTransfers(pyblish.api.InstancePlugin):
+    """Remove files linked by 'TransferToPublish' which were not published.
+
+    Publish path resolved before integration might differ from the one
+    used by integrator (eg. custom template data), such file would be left
+    in publish directory.
+    """
+
+    order = pyblish.api.IntegratorOrder + 0.1
+    label = "Cleanup Publish Transfers"
+    hosts = ["photoshop"]
+
+    def process(self, instance):
+        transfers = instance.data.get("publishTransfers")
+        if not transfers:
+            return
+
+        published_paths = {
+            os.path.normpath(str(repre["published_path"]))
+            for repre in instance.data.get("representations") or []
+            if repre.get("published_path")
+        }
+        published_repres = instance.data.get("published_representations")
+        for repre_info in (published_repres or {}).values():
+            published_paths.update(
+                os.path.normpath(str(path))
+                for path in repre_info.get("published_files") or []
+            )
+        for _, dst_path in transfers:
+            if dst_path in published_paths:
+                continue
+            self.log.warning(
+                f"Linked file {dst_path} was not published, removing it."
+            )
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
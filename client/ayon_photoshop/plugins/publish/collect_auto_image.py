@@ -31,14 +31,15 @@ class CollectAutoImage(pyblish.api.ContextPlugin):
                 return
 
         stub = photoshop.stub()
-        stored_items = stub.get_layers_metadata()
+        snapshot = photoshop.get_document_snapshot(context)
+        stored_items = snapshot.layers_meta
         for item in stored_items:
             if item.get("creator_identifier") == "auto_image":
                 if not item.get("active"):
                     self.log.debug("Auto_image instance disabled")
                     return
 
-        layer_items = stub.get_layers()
+        layer_items = snapshot.layers
 
         publishable_ids = [layer.id for layer in layer_items
                            if layer.visible]
@@ -19,9 +19,10 @@ class CollectAutoImageRefresh(pyblish.api.ContextPlugin):
                 self.log.debug(
                     "Auto image instance found, filling layer ids to export."
                 )
+                snapshot = photoshop.get_document_snapshot(context)
                 publishable_ids = [
                     layer.id
-                    for layer in photoshop.stub().get_layers()
+                    for layer in snapshot.layers
                     if layer.visible
                 ]
                 instance.data["ids"] = publishable_ids
@@ -48,8 +48,7 @@ class CollectAutoReview(pyblish.api.ContextPlugin):
             self.log.debug("Review creator disabled, won't create new")
             return
 
-        stub = photoshop.stub()
-        stored_items = stub.get_layers_metadata()
+        stored_items = photoshop.get_document_snapshot(context).layers_meta
         for item in stored_items:
             if item.get("creator_identifier") == "review":
                 if not item.get("active"):
@@ -44,8 +44,7 @@ class CollectAutoWorkfile(pyblish.api.ContextPlugin):
             self.log.debug("Workfile creator disabled, won't create new")
             return
 
-        stub = photoshop.stub()
-        stored_items = stub.get_layers_metadata()
+        stored_items = photoshop.get_document_snapshot(context).layers_meta
         for item in stored_items:
             if item.get("creator_identifier") == "workfile":
                 if not item.get("active"):
@@ -1,3 +1,4 @@
+import copy
 import os
 import re
 
@@ -73,6 +74,7 @@ class CollectColorCodedInstances(pyblish.api.ContextPlugin):
         publishable_layers = []
         created_instances = []
         product_base_type_from_settings = None
+        renamed = False
         for layer in layers:
             self.log.debug(f"Layer:: {layer}")
             if layer.parents:
@@ -112,9 +114,11 @@ class CollectColorCodedInstances(pyblish.api.ContextPlugin):
             product_name = resolved_product_template.format(
                 **prepare_template_data(fill_pairs))
 
+            layer_name = layer.name
             product_name = self._clean_product_name(
                 stub, naming_conventions, product_name, layer
             )
+            renamed = renamed or layer.name != layer_name
 
             if product_name in existing_product_names:
                 self.log.info(
@@ -136,6 +140,9 @@ class CollectColorCodedInstances(pyblish.api.ContextPlugin):
             existing_product_names.append(product_name)
             publishable_layers.append(layer)
 
+        if renamed:
+            photoshop.refresh_document_snapshot(context)
+
         if self.create_flatten_image != "no" and publishable_layers:
             self.log.debug("create_flatten_image")
             if not self.flatten_product_name_template:
@@ -146,7 +153,8 @@ class CollectColorCodedInstances(pyblish.api.ContextPlugin):
             product_name = self.flatten_product_name_template.format(
                 **prepare_template_data(fill_pairs))
 
-            first_layer = publishable_layers[0]  # dummy layer
+            # dummy layer, copied as layers are shared with stub cache
+            first_layer = copy.copy(publishable_layers[0])
             first_layer.name = product_name
             # inherit product base type
             product_base_type = product_base_type_from_settings
@@ -0,0 +1,158 @@
+"""Collects fingerprint of content of image instances.
+
+Fingerprint is compared with fingerprint stored on last published version of
+product. If it matches, content didn't change and extractors hard link
+published files instead of exporting them from Photoshop again.
+
+Fingerprint contains all properties of layers in instance (and its parent
+groups) and histograms of isolated composite. Change which keeps all of
+them (eg. only moving pixels within layer bounds) is not detected, that's
+why collector is disabled by default. Instances containing layers with raw
+data (embedded smart objects, patterns) are never reused.
+
+Requires:
+    instance -> members
+    instance -> productName
+    context -> folderEntity
+
+Provides:
+    instance -> contentFingerprint
+    instance -> versionData["contentFingerprint"]
+    instance -> reusedRepresentationPaths - {representation name: path}
+        of last published version if content didn't change
+    instance -> reusedVersionData - data of reused version
+"""
+import hashlib
+import json
+import os
+
+import ayon_api
+import pyblish.api
+
+from ayon_core.pipeline.load import get_representation_path_with_anatomy
+from ayon_photoshop import api as photoshop
+
+
+class CollectContentFingerprint(pyblish.api.ContextPlugin):
+    """Collect content fingerprint of image instances."""
+
+    order = pyblish.api.CollectorOrder + 0.3
+    label = "Collect Content Fingerprint"
+    hosts = ["photoshop"]
+    families = ["image"]
+    settings_category = "photoshop"
+    enabled = False
+
+    def process(self, context):
+        instances = []
+        for instance in context:
+            if not instance.data.get("publish", True):
+                continue
+            product_base_type = instance.data.get("productBaseType")
+            if not product_base_type:
+                product_base_type = instance.data["productType"]
+            if product_base_type in self.families and (
+                instance.data.get("members")
+            ):
+                instances.append(instance)
+
+        if not instances:
+            return
+
+        stub = photoshop.stub()
+        layer_tree = photoshop.get_document_snapshot(
+            context, check_changes=True
+        ).layer_tree
+        items = []
+        for idx, instance in enumerate(instances):
+            visibility, original = photoshop.get_isolated_visibility(
+                layer_tree, int(instance.data["members"][0])
+            )
+            items.append({
+                "name": str(idx),
+                "visibility": visibility,
+                "restore": original,
+            })
+        content = stub.get_content_fingerprints(items)
+
+        # output depends on extraction settings too
+        publish_settings = context.data["project_settings"]["photoshop"][
+            "publish"]
+        settings_data = {
+            plugin_name: publish_settings.get(plugin_name)
+            for plugin_name in ("ExtractImage", "ExtractLayers")
+        }
+
+        for idx, instance in enumerate(instances):
+            instance_id = int(instance.data["members"][0])
+            layer_ids = {
+                layer.id
+                for layer in layer_tree.get_layers_in_layers([instance_id])
+            }
+            layer_ids.update(layer_tree.ancestor_ids(instance_id))
+            fingerprint = self._get_fingerprint({
+                "layers": [
+                    content["layers"].get(str(layer_id))
+                    for layer_id in sorted(layer_ids)
+                ],
+                "histogram": content["histograms"].get(str(idx)),
+                "settings": settings_data,
+            })
+            self.log.debug(
+                f"{instance.data['productName']} fingerprint: {fingerprint}"
+            )
+            instance.data["contentFingerprint"] = fingerprint
+            instance.data.setdefault("versionData", {})[
+                "contentFingerprint"] = fingerprint
+
+            version_data, paths = self._get_reusable_paths(
+                context, instance, fingerprint
+            )
+            if paths:
+                self.log.info(
+                    f"Content of {instance} didn't change, published files"
+                    " will be reused."
+                )
+                instance.data["reusedRepresentationPaths"] = paths
+                instance.data["reusedVersionData"] = version_data
+
+    def _get_fingerprint(self, data):
+        payload = json.dumps(data, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _get_reusable_paths(self, context, instance, fingerprint):
+        """Returns paths of last published version with same fingerprint.
+
+        Returns:
+            tuple[dict, dict[str, str]]: data of last version and
+                {representation name: path}, empty if content changed or
+                any file is missing
+        """
+        project_name = context.data["projectName"]
+        folder_entity = (
+            instance.data.get("folderEntity") or context.data["folderEntity"]
+        )
+        version_entity = ayon_api.get_last_version_by_product_name(
+            project_name,
+            instance.data["productName"],
+            folder_entity["id"],
+            fields={"id", "data"},
+        )
+        if not version_entity:
+            return {}, {}
+        version_data = version_entity.get("data") or {}
+        if version_data.get("contentFingerprint") != fingerprint:
+            return {}, {}
+
+        anatomy = context.data["anatomy"]
+        paths = {}
+        for repre_entity in ayon_api.get_representations(
+            project_name, version_ids={version_entity["id"]}
+        ):
+            path = get_representation_path_with_anatomy(repre_entity, anatomy)
+            path = os.path.normpath(str(path))
+            if not os.path.isfile(path):
+                self.log.debug(f"Published file {path} is missing.")
+                return {}, {}
+            paths[repre_entity["name"]] = path
+        return version_data, paths
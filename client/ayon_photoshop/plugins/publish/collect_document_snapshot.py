@@ -0,0 +1,23 @@
+import pyblish.api
+
+from ayon_photoshop import api as photoshop
+
+
+class CollectDocumentSnapshot(pyblish.api.ContextPlugin):
+    """Capture state of active document shared by other plugins.
+
+    Layers, metadata, color profile, settings and name of document are read
+    once, plugins get them by 'photoshop.get_document_snapshot(context)'.
+    """
+
+    order = pyblish.api.CollectorOrder - 0.49
+    label = "Collect Document Snapshot"
+    hosts = ["photoshop"]
+
+    def process(self, context):
+        snapshot = photoshop.refresh_document_snapshot(context)
+        self.log.debug(
+            f"Collected snapshot of '{snapshot.document_name}':"
+            f" {len(snapshot.layers)} layers,"
+            f" {len(snapshot.layers_meta)} metadata items"
+        )
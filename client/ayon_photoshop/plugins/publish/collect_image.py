@@ -16,5 +16,6 @@ class CollectImage(pyblish.api.InstancePlugin):
 
     def process(self, instance):
         if instance.data.get("members"):
-            layer = api.stub().get_layer(instance.data["members"][0])
+            snapshot = api.get_document_snapshot(instance.context)
+            layer = snapshot.get_layer(instance.data["members"][0])
             instance.data["layer"] = layer
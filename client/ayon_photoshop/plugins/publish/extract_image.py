@@ -1,9 +1,12 @@
 import os
+import shutil
+import tempfile
 
 import pyblish.api
-from ayon_core.pipeline import publish
+from ayon_core.pipeline import publish, PublishError
 from ayon_core.pipeline.colorspace import get_remapped_colorspace_from_native
 from ayon_photoshop import api as photoshop
+from ayon_photoshop.api import tiled_export, transcoding, transfer
 
 
 class ExtractImage(
@@ -17,6 +20,26 @@ class ExtractImage(
 
     Logic tries to hide/unhide layers minimum times.
 
+    With 'render_once' Photoshop saves only one lossless PNG per instance,
+    formats which could be derived from it (JPG, TGA) are converted by
+    'oiiotool' instead of being flattened and saved by Photoshop again.
+    Conversions run in parallel ('encoder_workers') while Photoshop renders
+    next instance.
+
+    With 'use_layer_comps' visibility of each instance is captured to
+    temporary layer comp and all instances are exported in single call.
+
+    Documents larger than 'tiled_export_threshold' are exported by
+    Photoshop in tiles which are stitched into PNG and TGA, other formats
+    are converted from stitched PNG. Output of tiled export is 8 bit.
+
+    With 'trim_to_content' images are cropped to visible content of
+    instance, offset and canvas size are stored in representation data
+    ('trim') for downstream tools. Tiled export is never trimmed.
+
+    Files of last published version are reused if content of instance
+    didn't change (see 'CollectContentFingerprint').
+
     Called once for all publishable instances.
     """
 
@@ -26,6 +49,14 @@ class ExtractImage(
 
     families = ["image", "background"]
     formats = ["png", "jpg", "tga", "exr"]
+    render_once = False
+    use_layer_comps = False
+    # parallel conversions for 'render_once', 0 uses all CPU cores
+    encoder_workers = 0
+    # max canvas width or height exported at once, 0 disables tiled export
+    tiled_export_threshold = 0
+    tile_size = 4096
+    trim_to_content = False
     settings_category = "photoshop"
 
     def process(self, context):
@@ -42,14 +73,41 @@ class ExtractImage(
             return
 
         stub = photoshop.stub()
-        all_layers = stub.get_layers()  # Fetch once, reuse for all instances
-        native_colorspace = stub.get_color_profile_name()
+        # document might have changed since collection, visibility is
+        #   isolated and restored from current layers
+        snapshot = photoshop.get_document_snapshot(
+            context, check_changes=True
+        )
+        layer_tree = snapshot.layer_tree
+        native_colorspace = snapshot.color_profile
+        document_settings = snapshot.document_settings
         self.log.info(f"Document colorspace profile: {native_colorspace}")
         host_name = context.data["hostName"]
         project_settings = context.data["project_settings"]
         host_imageio_settings = project_settings["photoshop"]["imageio"]
 
-        with photoshop.maintained_selection():
+        file_basename = os.path.splitext(snapshot.document_name)[0]
+        ayon_colorspace = get_remapped_colorspace_from_native(
+            native_colorspace,
+            host_name,
+            host_imageio_settings,
+        )
+        self.log.debug(f"ayon_colorspace: {ayon_colorspace}")
+        tiled = self._is_tiled(document_settings)
+
+        encoder_pool = transcoding.EncoderPool(
+            max_workers=self.encoder_workers, logger=self.log
+        )
+        # reused files are transferred while Photoshop exports next ones
+        transfer_queue = transfer.TransferQueue(logger=self.log)
+        # exports and conversions waiting for single layer comps export
+        layer_comps_exports = []
+        layer_comps_conversions = []
+        layer_comps_instances = []
+        # restore after each instance and isolation of next one are sent
+        # together as single history state
+        with encoder_pool, transfer_queue, photoshop.maintained_selection(), \
+                stub.transaction("Extract images"):
             for instance in filtered_instances:
                 suffix = instance.data["name"]
                 staging_dir = self.staging_dir(instance)
@@ -60,62 +118,291 @@ class ExtractImage(
                 if not members:
                     continue
                 instance_id = int(members[0])
+                # virtual groups collected by color coding or auto_image
+                instance.data.pop("ids", None)
 
-                # Context manager handles all visibility: show instance path,
-                # hide siblings, restore original state on exit
-                with photoshop.isolated_layers_visibility(stub, instance_id, all_layers):
-                    # Perform extraction
-                    files = {}
-                    ids = set()
-                    # real layers and groups
-                    if members:
-                        ids.update(int(member) for member in members)
-                    # virtual groups collected by color coding or auto_image
-                    add_ids = instance.data.pop("ids", None)
-                    if add_ids:
-                        ids.update(set(add_ids))
-
-                    file_basename, workfile_extension = os.path.splitext(
-                        stub.get_active_document_name()
+                files = {}
+                for extension in self.formats:
+                    repre_filename = f"{file_basename}_{suffix}.{extension}"
+                    files[extension] = repre_filename
+
+                trim = None
+                if self._reuse_published_files(
+                    instance, staging_dir, files, transfer_queue
+                ):
+                    self.log.info("Content didn't change, export skipped")
+                    reused_version_data = (
+                        instance.data.get("reusedVersionData") or {}
+                    )
+                    trim = reused_version_data.get("trimBounds")
+                elif tiled:
+                    self._export_tiled(
+                        stub, instance_id, layer_tree, staging_dir, files,
+                        encoder_pool
+                    )
+                elif self.use_layer_comps:
+                    outputs, conversions = self._prepare_outputs(
+                        staging_dir, files, encoder_pool
+                    )
+                    visibility_changes, _ = photoshop.get_isolated_visibility(
+                        layer_tree, instance_id
+                    )
+                    layer_comps_exports.append({
+                        "name": str(len(layer_comps_exports)),
+                        "visibility": visibility_changes,
+                        "outputs": [
+                            {"path": path, "ext": extension}
+                            for path, extension in outputs
+                        ],
+                        "trim": self.trim_to_content,
+                    })
+                    layer_comps_conversions.extend(conversions)
+                    layer_comps_instances.append(instance)
+                else:
+                    outputs, conversions = self._prepare_outputs(
+                        staging_dir, files, encoder_pool
                     )
-                    workfile_extension = workfile_extension.strip(".")
-
-                    for extension in self.formats:
-                        repre_filename = f"{file_basename}_{suffix}.{extension}"
-                        files[extension] = repre_filename
-
-                        full_filename = os.path.join(
-                            staging_dir, repre_filename)
-
-                        stub.saveAs(full_filename, extension, True)
-                        self.log.info(f"Extracted: {extension}")
-
-                    representations = []
-                    for extension, filename in files.items():
-                        repre = {
-                            "name": extension,
-                            "ext": extension,
-                            "files": filename,
-                            "stagingDir": staging_dir,
-                            "tags": [],
-                        }
-                        ayon_colorspace = get_remapped_colorspace_from_native(
-                            native_colorspace,
-                            host_name,
-                            host_imageio_settings,
-                        )
-                        self.log.debug(f"ayon_colorspace: {ayon_colorspace}")
-                        # inject colorspace data
-                        self.set_representation_colorspace(
-                            repre, context,
-                            colorspace=ayon_colorspace
-                        )
-                        self.log.debug(f"representation: {repre}")
-                        representations.append(repre)
-                    instance.data["representations"] = representations
-                    instance.data["stagingDir"] = staging_dir
-
-                    self.log.info(f"Extracted {instance} to {staging_dir}")
+                    # Context manager handles all visibility: show instance
+                    # path, hide siblings, restore original state on exit
+                    with photoshop.isolated_layers_visibility(
+                        stub, instance_id, layer_tree
+                    ):
+                        if self.trim_to_content:
+                            trim = stub.save_trimmed([
+                                {"path": path, "ext": extension}
+                                for path, extension in outputs
+                            ])
+                            self.log.info(f"Extracted trimmed: {trim}")
+                        else:
+                            for path, extension in outputs:
+                                stub.saveAs(path, extension, True)
+                                self.log.info(f"Extracted: {extension}")
+                    self._queue_conversions(encoder_pool, conversions)
+
+                representations = []
+                for extension, filename in files.items():
+                    repre = {
+                        "name": extension,
+                        "ext": extension,
+                        "files": filename,
+                        "stagingDir": staging_dir,
+                        "tags": [],
+                    }
+                    # inject colorspace data
+                    self.set_representation_colorspace(
+                        repre, context,
+                        colorspace=ayon_colorspace
+                    )
+                    self.log.debug(f"representation: {repre}")
+                    representations.append(repre)
+                instance.data["representations"] = representations
+                transfer.record_outputs(instance, representations)
+                instance.data["stagingDir"] = staging_dir
+                if trim:
+                    self._set_trim_data(instance, trim)
+
+                self.log.info(f"Extracted {instance} to {staging_dir}")
+
+            if layer_comps_exports:
+                result = self._export_layer_comps(stub, layer_comps_exports)
+                self._queue_conversions(encoder_pool, layer_comps_conversions)
+                for export, instance in zip(
+                    layer_comps_exports, layer_comps_instances
+                ):
+                    trim = (result.get(export["name"]) or {}).get("trim")
+                    if trim:
+                        self._set_trim_data(instance, trim)
+
+    def _set_trim_data(self, instance, trim):
+        """Stores offset and canvas size of trimmed images.
+
+        Stored on representations for downstream tools to place images
+        back and on version to be reused with published files.
+        """
+        for repre in instance.data["representations"]:
+            repre.setdefault("data", {})["trim"] = dict(trim)
+        instance.data.setdefault("versionData", {})["trimBounds"] = trim
+
+    def _is_tiled(self, document_settings):
+        if not self.tiled_export_threshold:
+            return False
+        size = max(
+            document_settings.get("width") or 0,
+            document_settings.get("height") or 0
+        )
+        if size <= self.tiled_export_threshold:
+            return False
+        bits = document_settings.get("bitsPerChannel") or ""
+        if "EIGHT" not in bits.upper():
+            self.log.warning(
+                f"Canvas size {size}px is over"
+                f" {self.tiled_export_threshold}px, but tiled export"
+                f" supports only 8 bit documents ({bits}),"
+                " exporting whole canvas."
+            )
+            return False
+        self.log.info(
+            f"Canvas size {size}px is over {self.tiled_export_threshold}px,"
+            " exporting in tiles."
+        )
+        return True
+
+    def _export_tiled(
+        self, stub, instance_id, layer_tree, staging_dir, files, encoder_pool
+    ):
+        """Exports instance in tiles and stitches them outside of Photoshop.
+
+        Formats which could be neither stitched nor converted (EXR) are
+        still saved by Photoshop at once.
+        """
+        stitched = {}
+        conversions = []
+        saved = []
+        for extension, filename in files.items():
+            path = os.path.join(staging_dir, filename)
+            if extension in tiled_export.STITCHED_EXTENSIONS:
+                stitched[extension] = path
+            elif transcoding.can_convert(extension):
+                conversions.append((path, extension))
+            else:
+                saved.append((path, extension))
+
+        master_ext = transcoding.MASTER_EXTENSION
+        if conversions and master_ext not in stitched:
+            basename = os.path.splitext(next(iter(files.values())))[0]
+            master_path = os.path.join(
+                staging_dir, f"{basename}_master.{master_ext}"
+            )
+            stitched[master_ext] = master_path
+            encoder_pool.remove_after(master_path)
+
+        tiles_dir = tempfile.mkdtemp(prefix="tiles_", dir=staging_dir)
+        try:
+            with photoshop.isolated_layers_visibility(
+                stub, instance_id, layer_tree
+            ):
+                for path, extension in saved:
+                    stub.saveAs(path, extension, True)
+                    self.log.info(f"Extracted: {extension}")
+                result = stub.export_tiles(tiles_dir, self.tile_size)
+
+            self.log.debug(f"Exported {len(result['tiles'])} tiles")
+            for extension, path in stitched.items():
+                tiled_export.stitch_tiles(
+                    result["tiles"],
+                    result["width"],
+                    result["height"],
+                    path,
+                    extension
+                )
+                self.log.info(f"Stitched: {extension}")
+        finally:
+            shutil.rmtree(tiles_dir, ignore_errors=True)
+
+        self._queue_conversions(encoder_pool, [
+            (stitched[master_ext], path, extension)
+            for path, extension in conversions
+        ])
+
+    def _reuse_published_files(
+        self, instance, staging_dir, files, transfer_queue
+    ):
+        """Queues transfer of files of last published version if content
+        didn't change.
+
+        Returns:
+            bool: True if all representation files were reused
+        """
+        reused_paths = instance.data.get("reusedRepresentationPaths")
+        if not reused_paths or not all(
+            extension in reused_paths for extension in files
+        ):
+            return False
+
+        for extension, filename in files.items():
+            transfer_queue.add(
+                reused_paths[extension],
+                os.path.join(staging_dir, filename)
+            )
+            self.log.info(f"Reused published: {extension}")
+        return True
+
+    def _prepare_outputs(self, staging_dir, files, encoder_pool):
+        """Splits representation files to saved and converted ones.
+
+        With 'render_once' formats which could be converted are not saved by
+        Photoshop, master image is saved instead (removed after conversions
+        if it is not one of representations).
+
+        Args:
+            staging_dir (str)
+            files (dict[str, str]): {extension: file name}
+            encoder_pool (transcoding.EncoderPool)
+
+        Returns:
+            tuple[list, list]: [(path, extension)] to be saved by Photoshop
+                and [(master path, path, extension)] to be converted
+        """
+        converted = set()
+        if self.render_once:
+            converted = {
+                extension
+                for extension in files
+                if transcoding.can_convert(extension)
+            }
+
+        outputs = []
+        conversions = []
+        master_path = None
+        if converted:
+            master_ext = transcoding.MASTER_EXTENSION
+            master_filename = files.get(master_ext)
+            if master_filename is None:
+                basename = os.path.splitext(next(iter(files.values())))[0]
+                master_filename = f"{basename}_master.{master_ext}"
+                # master is saved only for conversion
+                encoder_pool.remove_after(
+                    os.path.join(staging_dir, master_filename)
+                )
+            master_path = os.path.join(staging_dir, master_filename)
+            outputs.append((master_path, master_ext))
+
+        for extension, filename in files.items():
+            full_filename = os.path.join(staging_dir, filename)
+            if extension in converted:
+                conversions.append((master_path, full_filename, extension))
+            elif full_filename != master_path:
+                outputs.append((full_filename, extension))
+        return outputs, conversions
+
+    def _queue_conversions(self, encoder_pool, conversions):
+        for src_path, dst_path, extension in conversions:
+            encoder_pool.convert(src_path, dst_path, extension)
+            self.log.info(f"Queued conversion: {extension}")
+
+    def _export_layer_comps(self, stub, exports):
+        """Exports all instances in single call through layer comps.
+
+        Returns:
+            dict: result of 'stub.export_layer_comps'
+
+        Raises:
+            PublishError: when any export failed
+        """
+        result = stub.export_layer_comps(exports)
+        errors = []
+        for export in exports:
+            export_result = result.get(export["name"]) or {}
+            if export_result.get("error"):
+                errors.append(export_result["error"])
+                continue
+            for path in export_result.get("files", []):
+                self.log.info(f"Extracted: {path}")
+        if errors:
+            raise PublishError(
+                "Export of layer comps failed:\n{}".format("\n".join(errors))
+            )
+        return result
 
     def staging_dir(self, instance):
         """Provide a temporary directory in which to store extracted files
@@ -4,6 +4,7 @@ from ayon_core.pipeline import publish
 from ayon_core.pipeline.colorspace import get_remapped_colorspace_from_native
 from ayon_core.pipeline.publish import get_instance_staging_dir
 from ayon_photoshop import api as photoshop
+from ayon_photoshop.api import transfer
 
 
 class ExtractLayers(
@@ -23,7 +24,8 @@ class ExtractLayers(
 
     def process(self, instance):
         ps_stub = photoshop.stub()
-        native_colorspace = ps_stub.get_color_profile_name()
+        snapshot = photoshop.get_document_snapshot(instance.context)
+        native_colorspace = snapshot.color_profile
         self.log.info(f"Document colorspace profile: {native_colorspace}")
         host_name = instance.context.data["hostName"]
         project_settings = instance.context.data["project_settings"]
@@ -34,33 +36,32 @@ class ExtractLayers(
             host_imageio_settings,
         )
         self.log.debug(f"ayon_colorspace: {ayon_colorspace}")
-        # Duplicate the document to the staging directory
+        # Only instance layerset is exported to the staging directory
         filepath = Path(
             get_instance_staging_dir(instance),
-            ps_stub.get_active_document_name()
+            snapshot.document_name
         )
-        self.log.info(f"Duplicating document to staging directory: {filepath}")
-        with ps_stub.duplicate_document(
-            filepath
-        ):
-            # Delete all layers except the instance layerset
-            layer = instance.data.get("layer")
-            ps_stub.delete_all_layers(
-                exclude_layers=[layer],
-                exclude_recursive=True
-            )
+        reused_paths = instance.data.get("reusedRepresentationPaths") or {}
+        if "psd" in reused_paths:
+            self.log.info("Content didn't change, reusing published file")
+            with transfer.TransferQueue(logger=self.log) as transfer_queue:
+                transfer_queue.add(reused_paths["psd"], str(filepath))
+            self._add_representation(instance, filepath, ayon_colorspace)
+            return
 
-            # Merge all layersets within the instance set
-            if self.merge_layersets:
-                self.log.info("Merging all layersets within instance set...")
-                ps_stub.merge_all_layersets(
-                    parent_set=layer.id
-                )
+        layer = instance.data.get("layer")
+        self.log.info(f"Exporting instance layerset to: {filepath}")
+        if self.merge_layersets:
+            self.log.info("Merging all layersets within instance set...")
+        ps_stub.export_layerset(
+            layer.id,
+            filepath,
+            merge_layersets=self.merge_layersets
+        )
 
-            # Dissolve instance layerset
-            self.log.info("Dissolving instance layerset...")
-            ps_stub.dissolve_layerset(layer.id)
+        self._add_representation(instance, filepath, ayon_colorspace)
 
+    def _add_representation(self, instance, filepath, ayon_colorspace):
         instance.data["stagingDir"] = filepath.parent
         representations = instance.data.setdefault("representations", [])
         representation = {
@@ -76,3 +77,4 @@ class ExtractLayers(
         )
         self.log.debug(f"Rrepresentation: {representation}")
         representations.append(representation)
+        transfer.record_outputs(instance, [representation])
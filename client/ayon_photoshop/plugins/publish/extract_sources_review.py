@@ -3,6 +3,7 @@ import os
 from ayon_core.pipeline import publish
 from ayon_core.pipeline.colorspace import get_remapped_colorspace_from_native
 from ayon_photoshop import api as photoshop
+from ayon_photoshop.api import compositor, transcoding
 
 
 class ExtractSourcesReview(
@@ -27,6 +28,14 @@ class ExtractSourcesReview(
         review as a single item and see full image. In most cases 'image'
         product type is separated by layers to better usage in animation
         or comp.)
+
+        Images already extracted by `ExtractImage` are reused as sources,
+        they are converted by 'oiiotool' instead of being saved by Photoshop
+        again. Flatten image is composited with blend modes of instances by
+        NumPy ('api.compositor'), by 'oiiotool' without NumPy. Photoshop is
+        used only for layers without extracted lossless image or when
+        compositing would not match Photoshop (unsupported blend modes,
+        nested instances).
     """
 
     label = "Extract Sources for Review"
@@ -37,13 +46,23 @@ class ExtractSourcesReview(
 
     # Extract Options
     make_image_sequence = None
+    reuse_extracted_images = True
+    # max width or height of review sources, 0 keeps canvas resolution
+    max_review_dimension = 0
+
+    # lossless representations of 'ExtractImage', in order of preference
+    master_extensions = ("png", "tga")
+    # blend modes whose isolated images could be composited 'over'
+    over_blend_modes = {"normal", "passThrough"}
 
     def process(self, instance):
         staging_dir = self.staging_dir(instance)
         self.log.info("Outputting image to {}".format(staging_dir))
 
-        stub = photoshop.stub()
-        native_colorspace = stub.get_color_profile_name()
+        snapshot = photoshop.get_document_snapshot(
+            instance.context, check_changes=True
+        )
+        native_colorspace = snapshot.color_profile
         self.log.info(f"Document colorspace profile: {native_colorspace}")
         host_name = instance.context.data["hostName"]
         project_settings = instance.context.data["project_settings"]
@@ -55,10 +74,22 @@ class ExtractSourcesReview(
         )
         self.log.debug(f"ayon_colorspace: {ayon_colorspace}")
         self.output_seq_filename = os.path.splitext(
-            stub.get_active_document_name())[0] + ".%04d.jpg"
+            snapshot.document_name)[0] + ".%04d.jpg"
 
         layers = self._get_review_layers_for_instance(instance)
         self.log.info("Layers image instance found: {}".format(layers))
+        masters = {}
+        if self.reuse_extracted_images:
+            masters = self._get_extracted_masters(instance.context, layers)
+        resize = None
+        if self.max_review_dimension:
+            document_settings = snapshot.document_settings
+            resize = transcoding.get_review_resolution(
+                document_settings.get("width") or 0,
+                document_settings.get("height") or 0,
+                self.max_review_dimension
+            )
+            self.log.debug(f"Review resolution: {resize}")
 
         additional_repre = {
             "name": "jpg",
@@ -73,10 +104,33 @@ class ExtractSourcesReview(
         if not product_base_type:
             product_base_type = instance.data["productType"]
         if product_base_type == "image":
-            self._attach_review_tag(instance)
+            review_path = None
+            if resize:
+                if not masters:
+                    masters = self._get_extracted_masters(
+                        instance.context, layers
+                    )
+                review_path = self._save_image_review(
+                    staging_dir, layers, masters, resize
+                )
+            if review_path:
+                # downscaled review, extracted images are kept untouched
+                additional_repre["name"] = "review"
+                additional_repre["files"] = os.path.basename(review_path)
+                additional_repre["output_name"] = "review"
+                additional_repre["tags"].append("delete")
+                self.set_representation_colorspace(
+                    additional_repre, instance.context,
+                    colorspace=ayon_colorspace
+                )
+                instance.data["representations"].append(additional_repre)
+            else:
+                self._attach_review_tag(instance)
         elif self.make_image_sequence and len(layers) > 1:
             self.log.debug("Extract layers to image sequence.")
-            img_list = self._save_sequence_images(staging_dir, layers)
+            img_list = self._save_sequence_images(
+                staging_dir, layers, masters, snapshot.layer_tree, resize
+            )
 
             instance.data["frameEnd"] = (
                 instance.data["frameStart"] + len(img_list) - 1)
@@ -94,7 +148,10 @@ class ExtractSourcesReview(
             self.log.debug("Extract layers to flatten image.")
             review_source_path = self._save_flatten_image(
                 staging_dir,
-                layers
+                layers,
+                masters,
+                snapshot.layer_tree,
+                resize
             )
             additional_repre["files"] = os.path.basename(review_source_path)
             additional_repre["output_name"] = "jpg"
@@ -128,6 +185,25 @@ class ExtractSourcesReview(
             repre = instance.data["representations"][0]
             repre["tags"].append("review")
 
+    def _save_image_review(self, staging_dir, layers, masters, resize):
+        """Converts image extracted for 'image' instance to downscaled JPG.
+
+        Returns:
+            str or None: path to JPG, None if there is no lossless image
+        """
+        if len(layers) != 1 or layers[0].id not in masters:
+            self.log.debug(
+                "No lossless image extracted, review is not downscaled."
+            )
+            return None
+        master_path, trim = masters[layers[0].id]
+        review_path = os.path.join(staging_dir, self.output_seq_filename % 0)
+        transcoding.convert_image(
+            master_path, review_path, "jpg", logger=self.log, trim=trim,
+            resize=resize
+        )
+        return review_path
+
     def _get_review_layers_for_instance(self, instance):
         """Collect all layers from image instance(s)
 
@@ -166,9 +242,122 @@ class ExtractSourcesReview(
         layers.sort()
         return layers
 
-    def _save_flatten_image(self, staging_dir, layers):
+    def _get_extracted_masters(self, context, layers):
+        """Finds lossless images of 'layers' extracted by 'ExtractImage'.
+
+        Returns:
+            dict[int, tuple[str, dict]]: {layer id: (path, trim)}
+        """
+        layer_ids = {layer.id for layer in layers}
+        masters = {}
+        for image_instance in context:
+            layer = image_instance.data.get("layer")
+            if layer is None or layer.id not in layer_ids:
+                continue
+            repres = {
+                repre["name"]: repre
+                for repre in image_instance.data.get("representations") or []
+                if isinstance(repre.get("files"), str)
+            }
+            for extension in self.master_extensions:
+                repre = repres.get(extension)
+                if repre is None:
+                    continue
+                path = os.path.join(repre["stagingDir"], repre["files"])
+                if os.path.exists(path):
+                    trim = (repre.get("data") or {}).get("trim")
+                    masters[layer.id] = (path, trim)
+                    break
+        return masters
+
+    def _get_composite_sources(self, layers, masters, layer_tree):
+        """Returns extracted images to composite 'layers' from.
+
+        Blend modes of instance layers are applied by 'compositor', groups
+        containing them must pass their content through unchanged. Layers
+        in pass through instance group blend with instances below it in
+        Photoshop, they must not use other blend mode than 'over' as their
+        extracted image is blended with transparency only.
+
+        Returns:
+            list[tuple[str, dict, str]] or None: (path, trim, blend mode)
+                from top to bottom, None if composite would not match
+                Photoshop
+        """
+        if not all(layer.id in masters for layer in layers):
+            return None
+        layer_ids = {layer.id for layer in layers}
+        for layer in layers:
+            ancestor_ids = layer_tree.ancestor_ids(layer.id)
+            # nested instance is already part of parent's image
+            if layer_ids.intersection(ancestor_ids):
+                return None
+            for item_id in ancestor_ids:
+                item = layer_tree.get(item_id)
+                if item.blend_mode not in self.over_blend_modes:
+                    self.log.debug(
+                        f"Group '{item.name}' uses '{item.blend_mode}',"
+                        " extracted images cannot be composited."
+                    )
+                    return None
+            item = layer_tree.get(layer.id)
+            if not self._can_composite(item.blend_mode):
+                self.log.debug(
+                    f"Layer '{item.name}' uses '{item.blend_mode}',"
+                    " extracted images cannot be composited."
+                )
+                return None
+            if item.blend_mode == "passThrough":
+                for child_id in layer_tree.descendant_ids(layer.id):
+                    child = layer_tree.get(child_id)
+                    if child.blend_mode not in self.over_blend_modes:
+                        self.log.debug(
+                            f"Layer '{child.name}' in '{item.name}' uses"
+                            f" '{child.blend_mode}', extracted images"
+                            " cannot be composited."
+                        )
+                        return None
+        return [
+            masters[layer.id] + (layer.blend_mode, )
+            for layer in layer_tree.layers
+            if layer.id in layer_ids
+        ]
+
+    def _can_composite(self, blend_mode):
+        if blend_mode in self.over_blend_modes:
+            return True
+        return compositor.is_available() and compositor.is_supported(
+            blend_mode
+        )
+
+    def _save_jpg(self, stub, output_image_path, resize):
+        """Saves visible content of document as review JPG.
+
+        Downscaled JPG is converted from lossless image saved by Photoshop.
+        """
+        if not resize:
+            stub.saveAs(output_image_path, 'jpg', True)
+            return
+        master_ext = transcoding.MASTER_EXTENSION
+        master_path = "{}_master.{}".format(
+            os.path.splitext(output_image_path)[0], master_ext
+        )
+        stub.saveAs(master_path, master_ext, True)
+        try:
+            transcoding.convert_image(
+                master_path, output_image_path, "jpg",
+                logger=self.log, resize=resize
+            )
+        finally:
+            os.remove(master_path)
+
+    def _save_flatten_image(
+        self, staging_dir, layers, masters, layer_tree, resize=None
+    ):
         """Creates flat image from 'layers' into 'staging_dir'.
 
+        Image is downscaled to 'resize' resolution if set.
+
         Returns:
             (str): path to new image
         """
@@ -178,39 +367,85 @@ class ExtractSourcesReview(
 
         self.log.info("Extracting {}".format(layers))
         if layers:
-            all_layers = stub.get_layers()
+            sources = self._get_composite_sources(layers, masters, layer_tree)
+            if sources and compositor.is_available():
+                self.log.info("Compositing extracted images")
+                compositor.composite_images(
+                    sources, output_image_path, "jpg", logger=self.log,
+                    resize=resize
+                )
+                return output_image_path
+            if sources:
+                self.log.info("Compositing extracted images by oiiotool")
+                transcoding.composite_images(
+                    [(path, trim) for path, trim, _ in sources],
+                    output_image_path,
+                    "jpg",
+                    logger=self.log,
+                    resize=resize
+                )
+                return output_image_path
+
             layer_ids = [layer.id for layer in layers]
             # Show all specified layers and their ancestors, hide all others
-            with photoshop.isolated_layers_visibility(stub, layer_ids, all_layers):
-                stub.saveAs(output_image_path, 'jpg', True)
+            with photoshop.isolated_layers_visibility(
+                stub, layer_ids, layer_tree
+            ):
+                self._save_jpg(stub, output_image_path, resize)
         else:
             # No layers specified - save full flattened document as-is
-            stub.saveAs(output_image_path, 'jpg', True)
+            self._save_jpg(stub, output_image_path, resize)
 
         return output_image_path
 
-    def _save_sequence_images(self, staging_dir, layers):
+    def _save_sequence_images(
+        self, staging_dir, layers, masters, layer_tree, resize=None
+    ):
         """Creates separate images from 'layers' into 'staging_dir'.
 
-        `layers` are actually groups matching instances.
+        `layers` are actually groups matching instances. Images are
+        downscaled to 'resize' resolution if set.
+
+        Frames are pipelined, Photoshop saves lossless image of layer (if
+        not extracted already) and JPG is encoded in background while
+        Photoshop saves next one.
 
         Used as source for multi frames .mov to review at once.
         Returns:
             (list): paths to new images
         """
         stub = photoshop.stub()
-        all_layers = stub.get_layers()
+        master_ext = transcoding.MASTER_EXTENSION
 
         list_img_filename = []
-        for i, layer in enumerate(layers):
-            self.log.info("Extracting {}".format(layer))
-
-            img_filename = self.output_seq_filename % i
-            output_image_path = os.path.join(staging_dir, img_filename)
-            list_img_filename.append(img_filename)
-
-            # Show only the layer and its ancestors, hide all others
-            with photoshop.isolated_layers_visibility(stub, layer.id, all_layers):
-                stub.saveAs(output_image_path, 'jpg', True)
+        # each 'saveAs' flushes batched calls, visibility of every frame
+        #   is isolated in its own history state
+        with transcoding.EncoderPool(logger=self.log) as encoder_pool:
+            for i, layer in enumerate(layers):
+                self.log.info("Extracting {}".format(layer))
+
+                img_filename = self.output_seq_filename % i
+                output_image_path = os.path.join(staging_dir, img_filename)
+                list_img_filename.append(img_filename)
+
+                if layer.id in masters:
+                    master_path, trim = masters[layer.id]
+                    encoder_pool.convert(
+                        master_path, output_image_path, "jpg", trim, resize
+                    )
+                    continue
+
+                master_path = "{}_master.{}".format(
+                    os.path.splitext(output_image_path)[0], master_ext
+                )
+                # Show only the layer and its ancestors, hide all others
+                with photoshop.isolated_layers_visibility(
+                    stub, layer.id, layer_tree
+                ):
+                    stub.saveAs(master_path, master_ext, True)
+                encoder_pool.convert(
+                    master_path, output_image_path, "jpg", resize=resize
+                )
+                encoder_pool.remove_after(master_path)
 
         return list_img_filename
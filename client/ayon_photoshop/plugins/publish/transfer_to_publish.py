@@ -0,0 +1,140 @@
+"""Links extracted files to their publish paths before integration.
+
+Integrator of 'ayon_core' copies representation files one by one. Files
+recorded by extractors ('transfer.record_outputs') are hard linked to
+their publish paths concurrently instead, integrator skips files which
+are already same file as their source. Files which cannot be linked
+(other filesystem) are left for integrator to copy.
+
+Publish path is resolved from publish template same way as integrator
+does it, 'CleanupPublishTransfers' removes linked files which integrator
+didn't publish.
+
+Requires:
+    instance -> transferOutputs
+    instance -> anatomyData
+    instance -> version
+
+Provides:
+    instance -> publishTransfers - [(source, destination)] of linked files
+"""
+import copy
+import os
+
+import pyblish.api
+
+from ayon_core.pipeline.publish import get_publish_template_name
+from ayon_photoshop.api import transfer
+
+
+class TransferToPublish(pyblish.api.ContextPlugin):
+    """Link extracted files to publish concurrently."""
+
+    order = pyblish.api.IntegratorOrder - 0.1
+    label = "Transfer To Publish"
+    hosts = ["photoshop"]
+    settings_category = "photoshop"
+    enabled = False
+
+    max_workers = 4
+
+    def process(self, context):
+        transfers = []
+        for instance in context:
+            if not instance.data.get("publish", True):
+                continue
+            for src_path, dst_path in self._get_transfers(instance):
+                transfers.append((instance, src_path, dst_path))
+
+        if not transfers:
+            self.log.debug("No recorded outputs to transfer.")
+            return
+
+        # only hard links are same files as sources, copies or clones
+        #   would be copied again by integrator
+        queue = transfer.TransferQueue(
+            max_workers=self.max_workers, reflink=False, copy=False,
+            logger=self.log
+        )
+        futures = [
+            queue.add(src_path, dst_path)
+            for _, src_path, dst_path in transfers
+        ]
+        try:
+            queue.wait()
+        except OSError as exc:
+            self.log.warning(
+                f"Some files were not linked, integrator copies them: {exc}"
+            )
+
+        for (instance, src_path, dst_path), future in zip(
+            transfers, futures
+        ):
+            if future.exception() is None:
+                instance.data.setdefault("publishTransfers", []).append(
+                    (src_path, dst_path)
+                )
+
+    def _get_transfers(self, instance):
+        """Returns (source, destination) of recorded representations.
+
+        Only files which could be linked to publish path which doesn't
+        exist yet are returned.
+        """
+        names = instance.data.get(transfer.OUTPUTS_KEY)
+        if not names:
+            return []
+        try:
+            path_template = self._get_path_template(instance)
+        except Exception:
+            self.log.debug(
+                f"Unable to resolve publish template of {instance}",
+                exc_info=True
+            )
+            return []
+
+        transfers = []
+        for repre in instance.data.get("representations") or []:
+            if repre["name"] not in names:
+                continue
+            if not isinstance(repre.get("files"), str):
+                continue
+            src_path = os.path.join(str(repre["stagingDir"]), repre["files"])
+            template_data = copy.deepcopy(instance.data["anatomyData"])
+            template_data["representation"] = repre["name"]
+            template_data["ext"] = repre["ext"]
+            template_data["version"] = instance.data["version"]
+            if repre.get("outputName"):
+                template_data["output"] = repre["outputName"]
+            try:
+                dst_path = os.path.normpath(
+                    str(path_template.format_strict(template_data))
+                )
+            except Exception:
+                self.log.debug(
+                    f"Unable to resolve publish path of {src_path}",
+                    exc_info=True
+                )
+                continue
+            if os.path.exists(dst_path):
+                # existing file is backed up by integrator
+                continue
+            if not transfer.is_same_device(src_path, dst_path):
+                continue
+            transfers.append((src_path, dst_path))
+        return transfers
+
+    def _get_path_template(self, instance):
+        context = instance.context
+        task_data = instance.data["anatomyData"].get("task") or {}
+        template_name = get_publish_template_name(
+            context.data["projectName"],
+            context.data["hostName"],
+            instance.data["productType"],
+            task_data.get("name"),
+            task_data.get("type"),
+            project_settings=context.data["project_settings"],
+            logger=self.log,
+        )
+        anatomy = context.data["anatomy"]
+        return anatomy.get_template_item("publish", template_name, "path")
@@ -59,6 +59,7 @@ class ValidateDocumentSettingsRepair(pyblish.api.Action):
             )
             return False
 
+        photoshop.refresh_document_snapshot(context)
         self.log.info("Document settings repaired successfully")
         return True
 
@@ -85,7 +86,7 @@ class ValidateDocumentSettings(
         if not self.is_active(context.data):
             return
 
-        info = photoshop.stub().get_document_settings()
+        info = photoshop.get_document_snapshot(context).document_settings
         if not info:
             raise PublishXmlValidationError(
                 self,
@@ -31,11 +31,13 @@ class ValidateInstanceFolderRepair(pyblish.api.Action):
         instances = pyblish.api.instances_by_plugin(failed, plugin)
         stub = photoshop.stub()
         current_folder_path = get_current_folder_path()
-        for instance in instances:
-            data = stub.read(instance[0])
-            if data.get("folderPath") != current_folder_path:
-                data["folderPath"] = current_folder_path
-                stub.imprint(instance[0], data)
+        with stub.metadata_transaction():
+            for instance in instances:
+                data = stub.read(instance[0])
+                if data.get("folderPath") != current_folder_path:
+                    data["folderPath"] = current_folder_path
+                    stub.imprint(instance[0], data)
+        photoshop.refresh_document_snapshot(context)
 
 
 class ValidateInstanceContext(
@@ -36,38 +36,46 @@ class ValidateNamingRepair(pyblish.api.Action):
         # Apply pyblish.logic to get the instances for the plug-in
         instances = pyblish.api.instances_by_plugin(failed, plugin)
         stub = photoshop.stub()
-        for instance in instances:
-            self.log.debug("validate_naming instance {}".format(instance))
-            current_layer_state = stub.get_layer(instance.data["layer"].id)
-            self.log.debug("current_layer{}".format(current_layer_state))
-
-            layer_meta = stub.read(current_layer_state)
-            instance_id = (layer_meta.get("instance_id") or
-                           layer_meta.get("uuid"))
-            if not instance_id:
-                self.log.warning("Unable to repair, cannot find layer")
-                continue
-
-            layer_name = re.sub(invalid_chars,
-                                replace_char,
-                                current_layer_state.clean_name)
-            layer_name = stub.PUBLISH_ICON + layer_name
-
-            stub.rename_layer(current_layer_state.id, layer_name)
-
-            product_name = re.sub(invalid_chars, replace_char,
-                                 instance.data["productName"])
-
-            # format from Tool Creator
-            product_name = re.sub(
-                "[^{}]+".format(PRODUCT_NAME_ALLOWED_SYMBOLS),
-                "",
-                product_name
-            )
+        with stub.transaction("Repair naming"), stub.metadata_transaction():
+            for instance in instances:
+                self.log.debug(
+                    "validate_naming instance {}".format(instance)
+                )
+                current_layer_state = stub.get_layer(
+                    instance.data["layer"].id
+                )
+                self.log.debug(
+                    "current_layer{}".format(current_layer_state)
+                )
+
+                layer_meta = stub.read(current_layer_state)
+                instance_id = (layer_meta.get("instance_id") or
+                               layer_meta.get("uuid"))
+                if not instance_id:
+                    self.log.warning("Unable to repair, cannot find layer")
+                    continue
+
+                layer_name = re.sub(invalid_chars,
+                                    replace_char,
+                                    current_layer_state.clean_name)
+                layer_name = stub.PUBLISH_ICON + layer_name
+
+                stub.rename_layer(current_layer_state.id, layer_name)
+
+                product_name = re.sub(invalid_chars, replace_char,
+                                     instance.data["productName"])
+
+                # format from Tool Creator
+                product_name = re.sub(
+                    "[^{}]+".format(PRODUCT_NAME_ALLOWED_SYMBOLS),
+                    "",
+                    product_name
+                )
 
-            layer_meta["productName"] = product_name
-            stub.imprint(instance_id, layer_meta)
+                layer_meta["productName"] = product_name
+                stub.imprint(instance_id, layer_meta)
 
+        photoshop.refresh_document_snapshot(context)
         return True
 
 
@@ -6,6 +6,12 @@ from .publish_plugins import PhotoshopPublishPlugins, DEFAULT_PUBLISH_SETTINGS
 from .workfile_builder import WorkfileBuilderPlugin
 
 
+metadata_storage_enum = [
+    {"value": "headline", "label": "File Info Headline"},
+    {"value": "xmp", "label": "Compressed XMP items"},
+]
+
+
 class PhotoshopSettings(BaseSettingsModel):
     """Photoshop Project Settings."""
 
@@ -15,6 +21,17 @@ class PhotoshopSettings(BaseSettingsModel):
         description="Triggers pre-launch hook which installs extension."
     )
 
+    metadata_storage: str = SettingsField(
+        "headline",
+        title="Metadata storage",
+        description=(
+            "Where AYON metadata are written in workfile. Headline is"
+            " readable by older versions of addon, XMP items are compressed"
+            " and written separately. Both are always read."
+        ),
+        enum_resolver=lambda: metadata_storage_enum,
+    )
+
     imageio: PhotoshopImageIOModel = SettingsField(
         default_factory=PhotoshopImageIOModel,
         title="OCIO config"
@@ -38,6 +55,7 @@ class PhotoshopSettings(BaseSettingsModel):
 
 DEFAULT_PHOTOSHOP_SETTING = {
     "auto_install_extension": True,
+    "metadata_storage": "headline",
     "create": DEFAULT_CREATE_SETTINGS,
     "publish": DEFAULT_PUBLISH_SETTINGS,
     "workfile_builder": {
@@ -107,6 +107,17 @@ class CollectVersionPlugin(BaseSettingsModel):
     enabled: bool = SettingsField(True, title="Enabled")
 
 
+class CollectContentFingerprintPlugin(BaseSettingsModel):
+    """Reuse published files of image instances whose content didn't change.
+
+    Reused files are hard linked (or cloned, copied) into staging
+    concurrently.
+
+    Changes which keep layer properties, bounds and histogram of composite
+    (eg. only moving pixels within layer) are not detected."""
+    enabled: bool = SettingsField(False, title="Enabled")
+
+
 class ValidateNamingPlugin(BaseSettingsModel):
     """Validate naming of products and layers"""  # noqa
     invalid_chars: str = SettingsField(
@@ -128,6 +139,57 @@ class ExtractImagePlugin(BaseSettingsModel):
         default_factory=list,
         enum_resolver=lambda: extract_image_ext_enum,
     )
+    render_once: bool = SettingsField(
+        False,
+        title="Render once, convert other formats",
+        description=(
+            "Photoshop saves only lossless PNG per instance, JPG and TGA"
+            " are converted from it by oiiotool. EXR is always saved by"
+            " Photoshop."
+        ),
+    )
+    use_layer_comps: bool = SettingsField(
+        False,
+        title="Export all instances through layer comps",
+        description=(
+            "Visibility of each instance is stored to temporary layer comp"
+            " and all instances are exported in single Photoshop call."
+        ),
+    )
+    encoder_workers: int = SettingsField(
+        0,
+        ge=0,
+        title="Parallel conversions",
+        description=(
+            "Number of formats converted in parallel while Photoshop"
+            " renders next instance. 0 uses all CPU cores."
+        ),
+    )
+    trim_to_content: bool = SettingsField(
+        False,
+        title="Trim to content",
+        description=(
+            "Crop images of each instance to its visible content. Offset"
+            " and canvas size are stored in representation data ('trim')."
+        ),
+    )
+    tiled_export_threshold: int = SettingsField(
+        0,
+        ge=0,
+        title="Tiled export from canvas size",
+        description=(
+            "Documents wider or higher than this (in pixels) are exported"
+            " by Photoshop in tiles stitched outside of Photoshop. Only 8"
+            " bit documents are tiled, others are exported whole. 0"
+            " disables tiled export."
+        ),
+    )
+    tile_size: int = SettingsField(
+        4096,
+        ge=256,
+        title="Tile size",
+        description="Width and height of exported tile in pixels.",
+    )
 
 
 class ExtractSourceReviewPlugin(BaseSettingsModel):
@@ -135,6 +197,24 @@ class ExtractSourceReviewPlugin(BaseSettingsModel):
         False,
         title="Make an image sequence instead of flatten image"
     )
+    reuse_extracted_images: bool = SettingsField(
+        True,
+        title="Reuse images from Extract Image",
+        description=(
+            "Review sources are converted from lossless images (PNG, TGA)"
+            " of Extract Image instead of being saved by Photoshop again."
+        ),
+    )
+    max_review_dimension: int = SettingsField(
+        0,
+        ge=0,
+        title="Max review resolution",
+        description=(
+            "Review sources wider or higher than this (in pixels) are"
+            " downscaled to fit, 'image' products get separate downscaled"
+            " review image. 0 keeps canvas resolution."
+        ),
+    )
 
 
 class ExtractLayersPlugin(BaseSettingsModel):
@@ -165,6 +245,19 @@ class ValidateDocumentSettingsPlugin(BaseSettingsModel):
     )
 
 
+class TransferToPublishPlugin(BaseSettingsModel):
+    """Hard link extracted images and layers to publish before integration.
+
+    Files are linked concurrently when staging and publish directories are
+    on same filesystem, integrator copies the rest."""
+    enabled: bool = SettingsField(False, title="Enabled")
+    max_workers: int = SettingsField(
+        4,
+        ge=1,
+        title="Parallel transfers",
+    )
+
+
 class PhotoshopPublishPlugins(BaseSettingsModel):
     CollectColorCodedInstances: CollectColorCodedInstancesPlugin = (
         SettingsField(
@@ -182,6 +275,13 @@ class PhotoshopPublishPlugins(BaseSettingsModel):
         default_factory=CollectVersionPlugin,
     )
 
+    CollectContentFingerprint: CollectContentFingerprintPlugin = (
+        SettingsField(
+            title="Collect Content Fingerprint",
+            default_factory=CollectContentFingerprintPlugin,
+        )
+    )
+
     ValidateNaming: ValidateNamingPlugin = SettingsField(
         title="Validate naming of products and layers",
         default_factory=ValidateNamingPlugin,
@@ -207,6 +307,11 @@ class PhotoshopPublishPlugins(BaseSettingsModel):
         default_factory=ValidateDocumentSettingsPlugin,
     )
 
+    TransferToPublish: TransferToPublishPlugin = SettingsField(
+        title="Transfer To Publish",
+        default_factory=TransferToPublishPlugin,
+    )
+
 
 DEFAULT_PUBLISH_SETTINGS = {
     "CollectColorCodedInstances": {
@@ -220,6 +325,9 @@ DEFAULT_PUBLISH_SETTINGS = {
     "CollectVersion": {
         "enabled": False
     },
+    "CollectContentFingerprint": {
+        "enabled": False
+    },
     "ValidateNaming": {
         "invalid_chars": "[ \\\\/+\\*\\?\\(\\)\\[\\]\\{\\}:,;]",
         "replace_char": "_"
@@ -228,10 +336,18 @@ DEFAULT_PUBLISH_SETTINGS = {
         "formats": [
             "png",
             "jpg",
-        ]
+        ],
+        "render_once": False,
+        "use_layer_comps": False,
+        "encoder_workers": 0,
+        "trim_to_content": False,
+        "tiled_export_threshold": 0,
+        "tile_size": 4096
     },
     "ExtractSourcesReview": {
         "make_image_sequence": False,
+        "reuse_extracted_images": True,
+        "max_review_dimension": 0,
     },
     "ExtractLayers": {
         "enabled": False,
@@ -244,5 +360,9 @@ DEFAULT_PUBLISH_SETTINGS = {
         "expected_dpi": 72,
         "expected_mode": "RGB",
         "expected_bits": "8"
+    },
+    "TransferToPublish": {
+        "enabled": False,
+        "max_workers": 4
     }
 }
@@ -0,0 +1,105 @@
+"""Compares JSON backends of 'api.json_codec' on realistic payloads.
+
+Payloads mimic layers sent by 'getLayers' and metadata items stored in
+Headline of document. Run manually, with 'orjson' installed to compare
+both backends:
+
+    python tools/benchmark_json_codec.py [layers_count]
+"""
+import importlib.util
+import json
+import os
+import sys
+import timeit
+
+# loaded by path, package 'ayon_photoshop' requires 'ayon_core'
+_CODEC_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "client", "ayon_photoshop", "api", "json_codec.py"
+)
+_spec = importlib.util.spec_from_file_location("json_codec", _CODEC_PATH)
+json_codec = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(json_codec)
+
+
+def create_layers_payload(count):
+    layers = []
+    parent_id = None
+    for idx in range(count):
+        is_group = idx % 10 == 0
+        layers.append({
+            "id": idx + 1,
+            "name": "layer_{}_Main_v001".format(idx),
+            "group": is_group,
+            "parent": parent_id,
+            "visible": bool(idx % 3),
+            "type": 4 if is_group else 1,
+            "color_code": "red" if is_group else "none",
+            "blend_mode": "normal",
+            "long_name": "group_{}|layer_{}".format(idx // 10, idx),
+        })
+        if is_group:
+            parent_id = idx + 1
+    return layers
+
+
+def create_headline_payload(count):
+    items = []
+    for idx in range(count):
+        items.append({
+            "id": "ayon.create.instance",
+            "productType": "image",
+            "variant": "Main{}".format(idx),
+            "folderPath": "/shots/sq01/sh{:03d}".format(idx),
+            "task": "compositing",
+            "productName": "imageMain{}".format(idx),
+            "active": True,
+            "creator_identifier": "image",
+            "instance_id": "{:08x}-0000-4000-8000-000000000000".format(idx),
+            "members": [str(idx + 1)],
+            "creator_attributes": {"mark_for_review": False},
+            "publish_attributes": {
+                "ValidateNaming": {"active": True},
+                "ExtractImage": {"active": True},
+            },
+        })
+    return items
+
+
+def benchmark(count=1000, repeat=20):
+    backends = [
+        ("json", json_codec._stdlib_dumps, json_codec._stdlib_loads)
+    ]
+    if json_codec.orjson is not None:
+        backends.append(
+            ("orjson", json_codec._orjson_dumps, json_codec._orjson_loads)
+        )
+
+    payloads = [
+        ("layers", create_layers_payload(count)),
+        ("headline", create_headline_payload(count // 10 or 1)),
+    ]
+    # what was sent over the wire before
+    pretty = json.dumps(payloads[1][1], indent=4)
+    print("headline size indent=4: {} B, compact: {} B".format(
+        len(pretty), len(json_codec._stdlib_dumps(payloads[1][1]))
+    ))
+    for payload_name, data in payloads:
+        serialized = json_codec._stdlib_dumps(data)
+        print("{} ({} items, {} B)".format(
+            payload_name, len(data), len(serialized)
+        ))
+        for backend_name, _dumps, _loads in backends:
+            dumps_time = min(timeit.repeat(
+                lambda: _dumps(data), number=repeat, repeat=3
+            )) / repeat
+            loads_time = min(timeit.repeat(
+                lambda: _loads(serialized), number=repeat, repeat=3
+            )) / repeat
+            print("    {:<8} dumps {:8.3f} ms  loads {:8.3f} ms".format(
+                backend_name, dumps_time * 1000, loads_time * 1000
+            ))
+
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])